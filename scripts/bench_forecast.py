@@ -0,0 +1,155 @@
+"""Benchmark price forecasting in pricing-service.
+
+Fills a throwaway SQLite database with price_history for thousands of
+categories and dynamic_pricing rows for every category x location, then
+times the vectorized PriceForecaster fit against a per-category NumPy
+loop, an incremental refit after new history rows, and the forecast
+endpoint for every category at each location.
+
+    python scripts/bench_forecast.py --categories 2000 --locations 50
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_app(db_path):
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{db_path}",
+        AUTH_SERVICE_URL="http://127.0.0.1:9",
+        SECRET_KEY="bench",
+        DEMAND_INTERVAL="0",
+    )
+    sys.path.insert(0, os.path.join(ROOT, "services", "pricing-service"))
+    sys.path.insert(0, os.path.join(ROOT, "services"))
+    import app
+
+    return app
+
+
+def populate(app, categories, locations, points):
+    rng = random.Random(1)
+    now = datetime.datetime.utcnow()
+    ids = []
+    for i in range(categories):
+        category = app.ScrapCategory(
+            name=f"bench-{i}", base_price=rng.uniform(5, 50), unit="kg"
+        )
+        app.db.session.add(category)
+        ids.append(category)
+    app.db.session.flush()
+    ids = [c.id for c in ids]
+
+    history = []
+    for category_id in ids:
+        price, trend = rng.uniform(5, 50), rng.uniform(-0.05, 0.05)
+        for day in range(points, 0, -1):
+            history.append(
+                {
+                    "category_id": category_id,
+                    "price": price + trend * (points - day) + rng.gauss(0, 0.5),
+                    "changed_at": now - datetime.timedelta(days=day),
+                }
+            )
+    app.db.session.execute(app.db.insert(app.PriceHistory), history)
+
+    app.db.session.execute(
+        app.db.insert(app.DynamicPricing),
+        [
+            {
+                "category_id": category_id,
+                "location": f"CITY-{j}",
+                "multiplier": rng.uniform(0.8, 1.3),
+            }
+            for category_id in ids
+            for j in range(locations)
+        ],
+    )
+    app.db.session.commit()
+    return ids
+
+
+def loop_fit(forecaster):
+    """One weighted polyfit per category over the same arrays"""
+    fits = {}
+    for category_id in np.unique(forecaster._categories):
+        rows = forecaster._categories == category_id
+        t = forecaster._times[rows] - forecaster._times[rows][-1]
+        w = 0.5 ** (-t / forecaster.halflife_days)
+        prices = forecaster._prices[rows]
+        fits[category_id] = np.polyfit(t, prices, 1, w=np.sqrt(w))
+    return fits
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=2000)
+    parser.add_argument("--locations", type=int, default=50)
+    parser.add_argument("--points", type=int, default=60)
+    parser.add_argument("--new-rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    app = load_app(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    client = app.app.test_client()
+    with app.app.app_context():
+        ids = populate(app, args.categories, args.locations, args.points)
+        rows = args.categories * args.points
+        forecaster = app.PriceForecaster(
+            poll_interval=0,
+            lookback_days=app.FORECAST_LOOKBACK_DAYS,
+            halflife_days=app.FORECAST_HALFLIFE_DAYS,
+        )
+
+        _, load = timed(forecaster._load_new)
+        fit, vectorized = timed(forecaster._refit)
+        fits, looped = timed(loop_fit, forecaster)
+        for i, category_id in enumerate(fit["categories"]):
+            assert np.isclose(fit["slope"][i], fits[category_id][0])
+
+        rng = random.Random(2)
+        app.db.session.execute(
+            app.db.insert(app.PriceHistory),
+            [
+                {"category_id": rng.choice(ids), "price": rng.uniform(5, 50)}
+                for _ in range(args.new_rows)
+            ],
+        )
+        app.db.session.commit()
+        _, incremental = timed(forecaster.fit)
+
+        app.price_forecaster._fit = fit
+        app.price_forecaster._next_poll = float("inf")
+        app.multiplier_table.lookup(ids[0], "CITY-0")
+
+    started = time.perf_counter()
+    for j in range(args.locations):
+        res = client.get(f"/api/pricing/forecast?location=CITY-{j}")
+        assert len(res.get_json()["forecasts"]) == args.categories
+    endpoint = (time.perf_counter() - started) / args.locations
+
+    pairs = args.categories * args.locations
+    print(f"{args.categories} categories x {args.locations} locations, {rows} rows")
+    print(f"initial load:               {load * 1000:10.1f} ms")
+    print(f"vectorized fit:             {vectorized * 1000:10.1f} ms")
+    print(f"per-category loop fit:      {looped * 1000:10.1f} ms")
+    print(f"incremental refit (+{args.new_rows}):  {incremental * 1000:10.1f} ms")
+    print(f"forecast per location:      {endpoint * 1000:10.1f} ms")
+    print(f"category x location pairs:  {pairs / (endpoint * args.locations):10,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
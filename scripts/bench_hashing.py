@@ -0,0 +1,147 @@
+"""Benchmark password hashing throughput in auth-service.
+
+Times inline check_password_hash for every HASH_PROFILES entry on one core,
+then drives concurrent POST /api/auth/login through the hashing pool and
+reports logins per second per core, 503s from a saturated pool,
+and /api/auth/verify latency while the logins run.
+
+    python scripts/bench_hashing.py --profile standard --pool-size 2
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "bench-password"
+
+
+def load_app(db_path, profile, pool_size, queue_size):
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{db_path}",
+        SECRET_KEY="bench",
+        HASH_PROFILE=profile,
+        HASH_POOL_SIZE=str(pool_size),
+        HASH_QUEUE_SIZE=str(queue_size),
+        HASH_TIMEOUT="60",
+    )
+    sys.path.insert(0, os.path.join(ROOT, "services", "auth-service"))
+    import app
+
+    return app
+
+
+def inline_rate(app, method, seconds):
+    """Logins per second verifying hashes on the calling thread"""
+    password_hash = app.generate_password_hash(PASSWORD, method)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        assert app.check_password_hash(password_hash, PASSWORD)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def login_spike(app, users, clients, logins):
+    """Run `logins` concurrent logins from `clients` threads; returns
+    (elapsed, succeeded, busy, verify latencies)"""
+    counts = {"ok": 0, "busy": 0}
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def run(worker):
+        client = app.app.test_client()
+        for i in range(worker, logins, clients):
+            res = client.post(
+                "/api/auth/login",
+                json={"email": users[i % len(users)], "password": PASSWORD},
+            )
+            with lock:
+                counts["ok" if res.status_code == 200 else "busy"] += 1
+
+    with app.app.app_context():
+        token = app.generate_token(app.User.query.first())
+
+    latencies = []
+
+    def verify():
+        client = app.app.test_client()
+        headers = {"Authorization": f"Bearer {token}"}
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/api/auth/verify", headers=headers)
+            latencies.append(time.perf_counter() - started)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=run, args=(w,)) for w in range(clients)]
+    watcher = threading.Thread(target=verify)
+    watcher.start()
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    watcher.join()
+    return elapsed, counts["ok"], counts["busy"], latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", default="standard")
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=8)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=48)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    app = load_app(
+        os.path.join(tempfile.mkdtemp(), "bench.db"),
+        args.profile,
+        args.pool_size,
+        args.queue_size,
+    )
+
+    print("inline, one core:")
+    for profile, method in app.HASH_PROFILES.items():
+        rate = inline_rate(app, method, args.seconds)
+        print(f"  {profile:10} {method:24} {rate:8.1f} logins/s")
+
+    with app.app.app_context():
+        password_hash = app.generate_password_hash(PASSWORD, app.HASH_METHOD)
+        users = [f"bench{i}@example.com" for i in range(args.users)]
+        app.db.session.add_all(
+            app.User(email=email, full_name="", password_hash=password_hash)
+            for email in users
+        )
+        app.db.session.commit()
+
+    elapsed, ok, busy, latencies = login_spike(app, users, args.clients, args.logins)
+    latencies.sort()
+    rate = ok / elapsed
+    cores = min(args.pool_size, os.cpu_count() or 1)
+    print(
+        f"pool of {args.pool_size} ({args.profile}), {args.clients} clients, "
+        f"queue {args.queue_size}:"
+    )
+    print(f"  logins:            {ok} ok, {busy} busy (503) in {elapsed:.2f} s")
+    print(f"  throughput:        {rate:8.1f} logins/s")
+    print(f"  per core ({cores}):      {rate / cores:8.1f} logins/s")
+    if latencies:
+        p50 = latencies[len(latencies) // 2]
+        p99 = latencies[int(len(latencies) * 0.99)]
+        print(
+            f"  verify during spike: p50 {p50 * 1000:.1f} ms, "
+            f"p99 {p99 * 1000:.1f} ms"
+        )
+
+    app.get_hash_pool().shutdown()
+
+
+if __name__ == "__main__":
+    main()
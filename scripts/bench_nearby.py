@@ -0,0 +1,159 @@
+"""Benchmark nearest-pending-pickup lookups in user-service.
+
+Loads N pending requests clustered around one city into a throwaway SQLite
+database, or an empty scratch database given by --database-url, then times
+GET /api/users/requests/nearby's lookup (find_nearby_pickups) against a full
+scan of every pending pickup.
+
+    python scripts/bench_nearby.py --pickups 1000000
+    python scripts/bench_nearby.py --database-url mysql+pymysql://u:p@host/scratch
+
+SQLite only turns a prefix LIKE into an index range with case_sensitive_like
+on, as MySQL always does, so the script enables it on SQLite connections.
+"""
+import argparse
+import heapq
+import os
+import random
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CITY = (18.52, 73.85)
+
+
+@event.listens_for(Engine, "connect")
+def sqlite_prefix_like(dbapi_connection, _):
+    if type(dbapi_connection).__module__.startswith("sqlite3"):
+        dbapi_connection.execute("PRAGMA case_sensitive_like = ON")
+
+
+def load_app(database_url):
+    os.environ.update(
+        DATABASE_URL=database_url,
+        AUTH_SERVICE_URL="http://127.0.0.1:9",
+        PRICING_SERVICE_URL="http://127.0.0.1:9",
+        SECRET_KEY="bench",
+        EVENT_COMPACT_INTERVAL="0",
+    )
+    sys.path.insert(0, os.path.join(ROOT, "services", "user-service"))
+    sys.path.insert(0, os.path.join(ROOT, "services"))
+    import app
+
+    return app
+
+
+def populate(app, count, batch=50000):
+    rng = random.Random(1)
+    requests_table = app.ScrapRequest.__table__
+    pickups_table = app.PendingPickup.__table__
+    with app.db.engine.begin() as conn:
+        for start in range(1, count + 1, batch):
+            ids = range(start, min(start + batch, count + 1))
+            points = [
+                (rng.gauss(CITY[0], 0.15), rng.gauss(CITY[1], 0.15)) for _ in ids
+            ]
+            conn.execute(
+                requests_table.insert(),
+                [
+                    {
+                        "id": i,
+                        "user_id": i,
+                        "category_id": 1,
+                        "quantity": 1.0,
+                        "pickup_address": "-",
+                        "status": "pending",
+                    }
+                    for i in ids
+                ],
+            )
+            conn.execute(
+                pickups_table.insert(),
+                [
+                    {
+                        "request_id": i,
+                        "user_id": i,
+                        "geohash": app.geohash_encode(
+                            lat, lon, app.PICKUP_GEOHASH_PRECISION
+                        ),
+                        "latitude": lat,
+                        "longitude": lon,
+                    }
+                    for i, (lat, lon) in zip(ids, points)
+                ],
+            )
+
+
+def full_scan(app, latitude, longitude, radius_km, limit):
+    rows = app.db.session.execute(
+        app.select(
+            app.PendingPickup.request_id,
+            app.PendingPickup.latitude,
+            app.PendingPickup.longitude,
+        )
+    )
+    candidates = (
+        (app.distance_km(latitude, longitude, lat, lon), request_id)
+        for request_id, lat, lon in rows
+    )
+    return heapq.nsmallest(limit, (c for c in candidates if c[0] <= radius_km))
+
+
+def timed(fn, queries):
+    started = time.perf_counter()
+    results = [fn(*q) for q in queries]
+    return (time.perf_counter() - started) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pickups", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--radius-km", type=float, default=10.0)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--scan-queries", type=int, default=3)
+    parser.add_argument("--database-url")
+    args = parser.parse_args()
+
+    app = load_app(
+        args.database_url
+        or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    )
+
+    started = time.perf_counter()
+    with app.app.app_context():
+        populate(app, args.pickups)
+    elapsed = time.perf_counter() - started
+    print(f"loaded {args.pickups} pending pickups in {elapsed:.1f}s")
+
+    rng = random.Random(2)
+    queries = [
+        (
+            rng.gauss(CITY[0], 0.1),
+            rng.gauss(CITY[1], 0.1),
+            args.radius_km,
+            args.limit,
+        )
+        for _ in range(args.queries)
+    ]
+
+    with app.app.app_context():
+        indexed, results = timed(app.find_nearby_pickups, queries)
+        scan, expected = timed(
+            lambda *q: full_scan(app, *q), queries[: args.scan_queries]
+        )
+
+    for got, want in zip(results, expected):
+        assert [r.id for _, r in got] == [i for _, i in want], "results differ"
+
+    print(f"geohash index:{indexed * 1000:8.2f} ms/query")
+    print(f"full scan:     {scan * 1000:8.2f} ms/query")
+    print(f"speedup:       {scan / indexed:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Benchmark pricing-rule evaluation in pricing-service.
+
+Creates categories and active pricing rules in a throwaway SQLite database,
+then times quotes through the compiled rules (compute_quote) against
+evaluating the same rules with a query per quote, and against the old
+hard-coded bulk bonus for reference.
+
+    python scripts/bench_rules.py --rules 500 --quotes 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALUE_RANGES = {
+    "tier": (1.0, 1.2),
+    "promotion": (1.0, 1.2),
+    "min_quantity": (1, 5),
+    "cap": (1000, 50000),
+}
+
+
+def load_app(db_path):
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{db_path}",
+        AUTH_SERVICE_URL="http://127.0.0.1:9",
+        SECRET_KEY="bench",
+        DEMAND_INTERVAL="0",
+    )
+    sys.path.insert(0, os.path.join(ROOT, "services", "pricing-service"))
+    sys.path.insert(0, os.path.join(ROOT, "services"))
+    import app
+
+    return app
+
+
+def populate(app, categories, rules):
+    rng = random.Random(1)
+    app.db.session.add_all(
+        app.ScrapCategory(name=f"bench-{i}", base_price=rng.uniform(5, 50), unit="kg")
+        for i in range(categories)
+    )
+    app.db.session.flush()
+    ids = [c.id for c in app.ScrapCategory.query.all()]
+
+    for _ in range(rules):
+        rule_type = rng.choice(["tier", "tier", "promotion", "min_quantity", "cap"])
+        app.db.session.add(
+            app.PricingRule(
+                category_id=rng.choice(ids + [None]),
+                rule_type=rule_type,
+                threshold=rng.uniform(0, 500),
+                value=rng.uniform(*VALUE_RANGES[rule_type]),
+                is_active=True,
+            )
+        )
+    app.bump_rules_version()
+    app.db.session.commit()
+    return ids
+
+
+def legacy_quote(app, category_id, base_price, quantity, multiplier):
+    """Before pricing rules: only the hard-coded bulk bonus"""
+    if quantity > 100:
+        multiplier *= 1.05
+    return multiplier, round(base_price * quantity * multiplier, 2)
+
+
+def queried_quote(app, category_id, base_price, quantity, multiplier):
+    """The same rules evaluated from a query per quote"""
+    now = app.datetime.datetime.utcnow()
+    rules = app.PricingRule.query.filter(
+        app.PricingRule.is_active.is_(True),
+        app.or_(
+            app.PricingRule.category_id == category_id,
+            app.PricingRule.category_id.is_(None),
+        ),
+    ).all()
+    compiled, _ = app.compile_rules(rules, now)
+    return compiled.apply(category_id, base_price, quantity, multiplier)
+
+
+def compiled_quote(app, category_id, base_price, quantity, multiplier):
+    return app.compute_quote(category_id, base_price, quantity, multiplier)
+
+
+def rate(app, quote, items):
+    started = time.perf_counter()
+    for item in items:
+        try:
+            quote(app, *item)
+        except app.QuoteError:
+            pass
+    return len(items) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--rules", type=int, default=500)
+    parser.add_argument("--quotes", type=int, default=20000)
+    parser.add_argument("--queried-quotes", type=int, default=2000)
+    args = parser.parse_args()
+
+    app = load_app(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    rng = random.Random(2)
+    with app.app.app_context():
+        ids = populate(app, args.categories, args.rules)
+        items = [
+            (rng.choice(ids), 10.0, rng.uniform(1, 1000), 1.0)
+            for _ in range(args.quotes)
+        ]
+
+        legacy = rate(app, legacy_quote, items)
+        compiled = rate(app, compiled_quote, items)
+        queried = rate(app, queried_quote, items[: args.queried_quotes])
+
+    print(f"{args.rules} rules over {args.categories} categories")
+    print(f"legacy bulk bonus:    {legacy:12,.0f} quotes/s")
+    print(f"compiled rules:       {compiled:12,.0f} quotes/s")
+    print(f"query per quote:      {queried:12,.0f} quotes/s")
+    print(f"compiled vs queried:  {compiled / queried:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
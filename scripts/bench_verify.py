@@ -0,0 +1,118 @@
+"""Benchmark token verification in user-service.
+
+Starts auth-service on a local port against a throwaway SQLite database,
+registers a user, then times user-service's per-request verification:
+the remote /api/auth/verify call every service used to make, local HS256
+verification, and local verification served from the token cache.
+
+    python scripts/bench_verify.py --requests 2000
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = "bench"
+
+AUTH_SERVER = """
+import sys
+from werkzeug.serving import run_simple
+import app
+run_simple("127.0.0.1", int(sys.argv[1]), app.app, threaded=True)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_auth(db_dir, port):
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'auth.db')}",
+        SECRET_KEY=SECRET_KEY,
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-c", AUTH_SERVER, str(port)],
+        cwd=os.path.join(ROOT, "services", "auth-service"),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/health", timeout=1)
+            return server, url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    server.kill()
+    raise SystemExit("auth-service did not start")
+
+
+def load_app(db_dir, auth_url):
+    os.environ.update(
+        DATABASE_URL=f"sqlite:///{os.path.join(db_dir, 'user.db')}",
+        AUTH_SERVICE_URL=auth_url,
+        PRICING_SERVICE_URL="http://127.0.0.1:9",
+        SECRET_KEY=SECRET_KEY,
+        EVENT_COMPACT_INTERVAL="0",
+    )
+    sys.path.insert(0, os.path.join(ROOT, "services", "user-service"))
+    sys.path.insert(0, os.path.join(ROOT, "services"))
+    import app
+
+    return app
+
+
+def latency(verify, token, count):
+    """Mean seconds per call; every call must resolve the user"""
+    started = time.perf_counter()
+    for _ in range(count):
+        assert verify(token)
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp()
+    server, auth_url = start_auth(db_dir, free_port())
+    try:
+        res = requests.post(
+            f"{auth_url}/api/auth/register",
+            json={"email": "bench@example.com", "password": "bench-password"},
+            timeout=30,
+        )
+        res.raise_for_status()
+        token = res.json()["token"]
+
+        app = load_app(db_dir, auth_url)
+        app.token_verifier.revocation_list.refresh()
+
+        remote = latency(app.token_verifier.fetch_user, token, args.requests)
+        local = latency(app.token_verifier.resolve, token, args.requests)
+        cached = latency(app.token_verifier.verify, token, args.requests)
+    finally:
+        server.terminate()
+        server.wait()
+
+    print(f"{args.requests} verifications each")
+    print(f"remote /api/auth/verify:  {remote * 1e6:10.1f} us/request")
+    print(f"local HS256 verify:       {local * 1e6:10.1f} us/request")
+    print(f"local + token cache:      {cached * 1e6:10.1f} us/request")
+    print(f"saved per request:        {(remote - cached) * 1e6:10.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,23 @@ from flask import Flask, request, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import event, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
 import jwt
 import datetime
+import glob
+import hashlib
+import json
 import os
+import threading
+import time
 from functools import wraps
 
 app = Flask(__name__)
@@ -21,30 +35,370 @@ if not app.config["SQLALCHEMY_DATABASE_URI"]:
 if not app.config["SECRET_KEY"]:
     raise RuntimeError("SECRET_KEY environment variable is required")
 
+MAX_BATCH_TOKENS = int(os.getenv("MAX_BATCH_TOKENS", "500"))
+MAX_BULK_USERS = int(os.getenv("MAX_BULK_USERS", "1000"))
+BULK_CHUNK_SIZE = 500
+MAX_PAGE_SIZE = 100
+
+# Optional asymmetric signing: JWT_KEYS_DIR holds <kid>.pem private keys (RSA
+# or Ed25519), all published on the JWKS endpoint; JWT_ACTIVE_KID signs new
+# tokens. Without JWT_ACTIVE_KID tokens are signed HS256 with SECRET_KEY.
+JWT_KEYS_DIR = os.getenv("JWT_KEYS_DIR")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+JWKS_MAX_AGE = int(os.getenv("JWKS_MAX_AGE", "86400"))
+
+# Werkzeug hash methods; changing HASH_PROFILE rehashes passwords on next login
+HASH_PROFILES = {
+    "fast": "pbkdf2:sha256:260000",
+    "standard": "pbkdf2:sha256:600000",
+    "strong": "scrypt:32768:8:1",
+}
+HASH_PROFILE = os.getenv("HASH_PROFILE", "standard")
+
+if HASH_PROFILE not in HASH_PROFILES:
+    raise RuntimeError(f"HASH_PROFILE must be one of {', '.join(HASH_PROFILES)}")
+
+HASH_METHOD = HASH_PROFILES[HASH_PROFILE]
+HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", "2"))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", "8"))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", "5"))
+
+# Upper bound on how long another worker may serve a stale role/is_active
+IDENTITY_CACHE_TTL = float(os.getenv("IDENTITY_CACHE_TTL", "30"))
+IDENTITY_CACHE_SIZE = int(os.getenv("IDENTITY_CACHE_SIZE", "10000"))
+
+REVOCATION_REFRESH = float(os.getenv("REVOCATION_REFRESH", "5"))
+REVOCATION_PAGE_SIZE = int(os.getenv("REVOCATION_PAGE_SIZE", "1000"))
+
+
+def load_signing_keys():
+    """Map kid -> (private key, JWT algorithm) for every PEM in JWT_KEYS_DIR"""
+    keys = {}
+    if not JWT_KEYS_DIR:
+        return keys
+
+    for path in sorted(glob.glob(os.path.join(JWT_KEYS_DIR, "*.pem"))):
+        kid = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as f:
+            key = load_pem_private_key(f.read(), password=None)
+
+        if isinstance(key, rsa.RSAPrivateKey):
+            keys[kid] = (key, "RS256")
+        elif isinstance(key, ed25519.Ed25519PrivateKey):
+            keys[kid] = (key, "EdDSA")
+        else:
+            raise RuntimeError(f"Unsupported key type in {path}")
+
+    return keys
+
+
+SIGNING_KEYS = load_signing_keys()
+
+if JWT_ACTIVE_KID and JWT_ACTIVE_KID not in SIGNING_KEYS:
+    raise RuntimeError(f"JWT_ACTIVE_KID {JWT_ACTIVE_KID} not found in JWT_KEYS_DIR")
+
 db = SQLAlchemy(app)
 
 
+# ----- PASSWORD HASHING 
+class HashPoolBusy(Exception):
+    """Raised when the hashing pool has no free slot or a hash timed out"""
+
+
+hash_pool = None
+hash_pool_lock = threading.Lock()
+hash_slots = threading.BoundedSemaphore(HASH_POOL_SIZE + HASH_QUEUE_SIZE)
+
+
+def get_hash_pool():
+    # Created lazily so each gunicorn worker forks its own pool
+    global hash_pool
+    with hash_pool_lock:
+        if hash_pool is None:
+            hash_pool = ProcessPoolExecutor(max_workers=HASH_POOL_SIZE)
+        return hash_pool
+
+
+def reset_hash_pool(broken):
+    """Drop a pool whose worker process died; a broken ProcessPoolExecutor
+    rejects every later job, so the next caller builds a fresh one"""
+    global hash_pool
+    with hash_pool_lock:
+        if hash_pool is broken:
+            hash_pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def submit_hash(fn, *args):
+    pool = get_hash_pool()
+    try:
+        return pool, pool.submit(fn, *args)
+    except BrokenProcessPool:
+        reset_hash_pool(pool)
+        pool = get_hash_pool()
+        return pool, pool.submit(fn, *args)
+
+
+def run_hash(fn, *args):
+    """Run a password hash function in the process pool, failing fast when
+    the pool and its queue are already full"""
+    if not hash_slots.acquire(blocking=False):
+        raise HashPoolBusy()
+
+    try:
+        pool, future = submit_hash(fn, *args)
+    except Exception:
+        hash_slots.release()
+        raise
+
+    future.add_done_callback(lambda _: hash_slots.release())
+
+    try:
+        return future.result(timeout=HASH_TIMEOUT)
+    except TimeoutError:
+        raise HashPoolBusy()
+    except BrokenProcessPool:
+        # A worker died mid-hash; answer busy so the client retries on a new pool
+        reset_hash_pool(pool)
+        raise HashPoolBusy()
+
+
+def busy_response():
+    return (
+        jsonify({"error": "Server busy, please retry"}),
+        503,
+        {"Retry-After": "1"},
+    )
+
+
 # ----- MODEL 
 class User(db.Model):
     __tablename__ = "users"
+    # Lets the admin directory seek by id within a role/is_active filter
+    __table_args__ = (db.Index("ix_users_role_active_id", "role", "is_active", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
-    full_name = db.Column(db.String(100))
+    full_name = db.Column(db.String(100), index=True)
     phone = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
     role = db.Column(db.String(20), default="user")
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = run_hash(generate_password_hash, password, HASH_METHOD)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return run_hash(check_password_hash, self.password_hash, password)
+
+    def needs_rehash(self):
+        return self.password_hash.split("$", 1)[0] != HASH_METHOD
+
+
+class RevokedToken(db.Model):
+    __tablename__ = "revoked_tokens"
+
+    id = db.Column(db.Integer, primary_key=True)
+    token_digest = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+
+# ---- IDENTITY CACHE 
+Identity = namedtuple("Identity", ["id", "email", "full_name", "role", "is_active"])
+
+
+class IdentityCache:
+    """Per-process LRU of user identities for token_required. Entries live for
+    IDENTITY_CACHE_TTL and are dropped once this process commits a change to
+    the row"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[user_id]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, identity):
+        with self._lock:
+            self._entries[identity.id] = (time.time() + self.ttl, identity)
+            self._entries.move_to_end(identity.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+identity_cache = IdentityCache(max_size=IDENTITY_CACHE_SIZE, ttl=IDENTITY_CACHE_TTL)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def collect_identity(mapper, connection, target):
+    # Flush runs before commit; invalidating here would let another request
+    # cache the old row again before the change is visible
+    object_session(target).info.setdefault("changed_users", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_identities(session):
+    for user_id in session.info.pop("changed_users", ()):
+        identity_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def discard_identities(session):
+    session.info.pop("changed_users", None)
+
+
+def load_identity(user_id):
+    identity = identity_cache.get(user_id)
+    if identity:
+        return identity
+
+    user = User.query.get(user_id)
+    if not user:
+        return None
+
+    identity = Identity(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=user.is_active,
+    )
+    identity_cache.put(identity)
+    return identity
+
+
+# ---- REVOCATION LIST 
+class RevocationList:
+    """Digests of revoked, unexpired tokens. Pulls new revoked_tokens rows by id
+    every REVOCATION_REFRESH seconds, so checks never hit the database"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._revoked = {}
+        self._last_id = 0
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+
+    def add(self, digest, expires_at):
+        with self._lock:
+            self._revoked[digest] = expires_at
+
+    def is_revoked(self, digest):
+        if time.time() >= self._next_refresh:
+            self.refresh()
+        return digest in self._revoked
+
+    def refresh(self):
+        # Only one thread refreshes; the rest keep using the current set
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            now = datetime.datetime.utcnow()
+            rows = (
+                RevokedToken.query.filter(RevokedToken.id > self._last_id)
+                .order_by(RevokedToken.id)
+                .all()
+            )
+            revoked = {d: e for d, e in self._revoked.items() if e > now}
+            for r in rows:
+                if r.expires_at > now:
+                    revoked[r.token_digest] = r.expires_at
+
+            if rows:
+                self._last_id = rows[-1].id
+            self._revoked = revoked
+        except Exception as e:
+            db.session.rollback()
+            print(f"Revocation refresh error: {e}")
+        finally:
+            # On failure keep the last known set and retry next interval
+            self._next_refresh = time.time() + self.interval
+            self._lock.release()
+
+    def stats(self):
+        return {"size": len(self._revoked), "last_id": self._last_id}
+
+
+revocation_list = RevocationList(interval=REVOCATION_REFRESH)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# ---- TOKEN HELPERS 
+def generate_token(user):
+    """Issue a JWT carrying the same user fields /api/auth/verify returns,
+    so other services can build the user dict without calling back here"""
+    payload = {
+        "user_id": user.id,
+        "email": user.email,
+        "full_name": user.full_name,
+        "role": user.role,
+        "exp": datetime.datetime.utcnow() + datetime.timedelta(days=7),
+    }
+
+    if JWT_ACTIVE_KID:
+        key, algorithm = SIGNING_KEYS[JWT_ACTIVE_KID]
+        return jwt.encode(
+            payload, key, algorithm=algorithm, headers={"kid": JWT_ACTIVE_KID}
+        )
+
+    return jwt.encode(payload, app.config["SECRET_KEY"], algorithm="HS256")
+
+
+def decode_token(token):
+    """Verify a token signed by any published key, or HS256 when it has no kid"""
+    kid = jwt.get_unverified_header(token).get("kid")
+
+    if kid:
+        if kid not in SIGNING_KEYS:
+            raise jwt.InvalidTokenError("Unknown key id")
+
+        key, algorithm = SIGNING_KEYS[kid]
+        return jwt.decode(token, key.public_key(), algorithms=[algorithm])
+
+    return jwt.decode(token, app.config["SECRET_KEY"], algorithms=["HS256"])
 
 
-# ---- TOKEN DECORATOR 
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -57,14 +411,19 @@ def token_required(f):
             token = token[7:]
 
         try:
-            data = jwt.decode(
-                token, app.config["SECRET_KEY"], algorithms=["HS256"]
-            )
-            current_user = User.query.get(data["user_id"])
+            data = decode_token(token)
+
+            if revocation_list.is_revoked(token_digest(token)):
+                return jsonify({"error": "Token revoked"}), 401
+
+            current_user = load_identity(data["user_id"])
 
             if not current_user:
                 return jsonify({"error": "Invalid token"}), 401
 
+            if not current_user.is_active:
+                return jsonify({"error": "Account disabled"}), 403
+
         except jwt.ExpiredSignatureError:
             return jsonify({"error": "Token expired"}), 401
         except jwt.InvalidTokenError:
@@ -78,7 +437,35 @@ def token_required(f):
 # ----- ROUTES 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "service": "auth-service"}), 200
+    return (
+        jsonify(
+            {
+                "status": "healthy",
+                "service": "auth-service",
+                "identity_cache": identity_cache.stats(),
+                "revocation_list": revocation_list.stats(),
+            }
+        ),
+        200,
+    )
+
+
+@app.route("/.well-known/jwks.json", methods=["GET"])
+def jwks():
+    """Public halves of the signing keys, for verifying tokens without a call here"""
+    keys = []
+    for kid, (key, algorithm) in SIGNING_KEYS.items():
+        if algorithm == "RS256":
+            jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+        else:
+            jwk = json.loads(OKPAlgorithm.to_jwk(key.public_key()))
+
+        jwk.update({"kid": kid, "alg": algorithm, "use": "sig"})
+        keys.append(jwk)
+
+    response = jsonify({"keys": keys})
+    response.headers["Cache-Control"] = f"public, max-age={JWKS_MAX_AGE}"
+    return response
 
 
 @app.route("/api/auth/register", methods=["POST"])
@@ -98,22 +485,16 @@ def register():
         role=data.get("role", "user"),
     )
 
-    user.set_password(data["password"])
+    try:
+        user.set_password(data["password"])
+    except HashPoolBusy:
+        return busy_response()
 
     try:
         db.session.add(user)
         db.session.commit()
 
-        token = jwt.encode(
-            {
-                "user_id": user.id,
-                "email": user.email,
-                "role": user.role,
-                "exp": datetime.datetime.utcnow() + datetime.timedelta(days=7),
-            },
-            app.config["SECRET_KEY"],
-            algorithm="HS256",
-        )
+        token = generate_token(user)
 
         return (
             jsonify(
@@ -145,22 +526,26 @@ def login():
 
     user = User.query.filter_by(email=data["email"]).first()
 
-    if not user or not user.check_password(data["password"]):
-        return jsonify({"error": "Invalid credentials"}), 401
+    try:
+        if not user or not user.check_password(data["password"]):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except HashPoolBusy:
+        return busy_response()
 
     if not user.is_active:
         return jsonify({"error": "Account disabled"}), 403
 
-    token = jwt.encode(
-        {
-            "user_id": user.id,
-            "email": user.email,
-            "role": user.role,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(days=7),
-        },
-        app.config["SECRET_KEY"],
-        algorithm="HS256",
-    )
+    if user.needs_rehash():
+        try:
+            user.set_password(data["password"])
+            db.session.commit()
+        except HashPoolBusy:
+            pass
+        except Exception as e:
+            db.session.rollback()
+            print(f"Password rehash error: {e}")
+
+    token = generate_token(user)
 
     return jsonify(
         {
@@ -192,20 +577,252 @@ def verify(current_user):
     )
 
 
-@app.route("/api/auth/refresh", methods=["POST"])
+@app.route("/api/auth/verify/batch", methods=["POST"])
+def verify_batch():
+    """Validate many tokens at once, resolving all users with one IN query"""
+    data = request.get_json() or {}
+    tokens = data.get("tokens")
+
+    if not isinstance(tokens, list) or not tokens:
+        return jsonify({"error": "tokens must be a non-empty list"}), 400
+
+    if len(tokens) > MAX_BATCH_TOKENS:
+        return (
+            jsonify({"error": f"At most {MAX_BATCH_TOKENS} tokens per request"}),
+            400,
+        )
+
+    decoded = []
+    for token in tokens:
+        if not isinstance(token, str):
+            decoded.append((None, "Invalid token"))
+            continue
+
+        if token.startswith("Bearer "):
+            token = token[7:]
+
+        try:
+            payload = decode_token(token)
+            if revocation_list.is_revoked(token_digest(token)):
+                decoded.append((None, "Token revoked"))
+            else:
+                decoded.append((payload.get("user_id"), None))
+        except jwt.ExpiredSignatureError:
+            decoded.append((None, "Token expired"))
+        except jwt.InvalidTokenError:
+            decoded.append((None, "Invalid token"))
+
+    user_ids = {user_id for user_id, _ in decoded if user_id}
+    users = {}
+    if user_ids:
+        users = {u.id: u for u in User.query.filter(User.id.in_(user_ids)).all()}
+
+    results = []
+    for user_id, error in decoded:
+        user = users.get(user_id)
+        if error or not user:
+            results.append({"valid": False, "error": error or "Invalid token"})
+            continue
+
+        if not user.is_active:
+            results.append({"valid": False, "error": "Account disabled"})
+            continue
+
+        results.append(
+            {
+                "valid": True,
+                "user": {
+                    "id": user.id,
+                    "email": user.email,
+                    "full_name": user.full_name,
+                    "role": user.role,
+                },
+            }
+        )
+
+    return jsonify({"results": results})
+
+
+@app.route("/api/auth/logout", methods=["POST"])
 @token_required
-def refresh(current_user):
-    token = jwt.encode(
+def logout(current_user):
+    token = request.headers.get("Authorization")
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    digest = token_digest(token)
+    expires_at = datetime.datetime.utcfromtimestamp(decode_token(token)["exp"])
+
+    try:
+        # Expired tokens fail verification anyway, so their rows can go
+        RevokedToken.query.filter(
+            RevokedToken.expires_at < datetime.datetime.utcnow()
+        ).delete()
+        db.session.add(
+            RevokedToken(
+                token_digest=digest,
+                user_id=current_user.id,
+                expires_at=expires_at,
+            )
+        )
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    revocation_list.add(digest, expires_at)
+
+    return jsonify({"message": "Logged out"})
+
+
+@app.route("/api/auth/revocations", methods=["GET"])
+def get_revocations():
+    """Revoked token digests with id > after, for other services to tail"""
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", REVOCATION_PAGE_SIZE, type=int)
+    # A zero page would report has_more without advancing last_id
+    if limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    limit = max(1, min(limit, REVOCATION_PAGE_SIZE))
+
+    rows = (
+        RevokedToken.query.filter(RevokedToken.id > after)
+        .order_by(RevokedToken.id)
+        .limit(limit)
+        .all()
+    )
+    now = datetime.datetime.utcnow()
+
+    return jsonify(
+        {
+            "revocations": [
+                {
+                    "token_digest": r.token_digest,
+                    "expires_at": int(
+                        r.expires_at.replace(tzinfo=datetime.timezone.utc).timestamp()
+                    ),
+                }
+                for r in rows
+                if r.expires_at > now
+            ],
+            "last_id": rows[-1].id if rows else after,
+            "has_more": len(rows) == limit,
+        }
+    )
+
+
+@app.route("/api/auth/users", methods=["GET"])
+@token_required
+def get_users(current_user):
+    """Projection of many users by id, for enriching admin listings in one
+    call. Admin only: it exposes contact details of arbitrary users"""
+    if current_user.role != "admin":
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        ids = sorted(
+            {int(i) for i in request.args.get("ids", "").split(",") if i.strip()}
+        )
+    except ValueError:
+        return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+
+    if len(ids) > MAX_BULK_USERS:
+        return jsonify({"error": f"At most {MAX_BULK_USERS} ids per request"}), 400
+
+    users = []
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start : start + BULK_CHUNK_SIZE]
+        users.extend(
+            db.session.query(
+                User.id,
+                User.email,
+                User.full_name,
+                User.phone,
+                User.role,
+                User.is_active,
+            )
+            .filter(User.id.in_(chunk))
+            .all()
+        )
+
+    return jsonify(
+        {
+            "users": [
+                {
+                    "id": u.id,
+                    "email": u.email,
+                    "full_name": u.full_name,
+                    "phone": u.phone,
+                    "role": u.role,
+                    "is_active": u.is_active,
+                }
+                for u in users
+            ]
+        }
+    )
+
+
+@app.route("/api/auth/admin/users", methods=["GET"])
+@token_required
+def admin_list_users(current_user):
+    """Admin user directory, seek-paginated on id: pass the returned
+    next_cursor as ?after= to get the following page"""
+    if current_user.role != "admin":
+        return jsonify({"error": "Forbidden"}), 403
+
+    after = request.args.get("after", 0, type=int)
+    limit = max(1, min(request.args.get("limit", 50, type=int), MAX_PAGE_SIZE))
+
+    query = User.query.filter(User.id > after)
+
+    role = request.args.get("role")
+    if role:
+        query = query.filter(User.role == role)
+
+    is_active = request.args.get("is_active")
+    if is_active is not None:
+        query = query.filter(User.is_active == (is_active.lower() == "true"))
+
+    q = request.args.get("q", "").strip()
+    if q:
+        prefix = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = query.filter(
+            or_(
+                User.email.like(prefix, escape="\\"),
+                User.full_name.like(prefix, escape="\\"),
+            )
+        )
+
+    users = query.order_by(User.id).limit(limit + 1).all()
+    has_more = len(users) > limit
+    users = users[:limit]
+
+    return jsonify(
         {
-            "user_id": current_user.id,
-            "email": current_user.email,
-            "role": current_user.role,
-            "exp": datetime.datetime.utcnow() + datetime.timedelta(days=7),
-        },
-        app.config["SECRET_KEY"],
-        algorithm="HS256",
+            "users": [
+                {
+                    "id": u.id,
+                    "email": u.email,
+                    "full_name": u.full_name,
+                    "phone": u.phone,
+                    "role": u.role,
+                    "is_active": u.is_active,
+                    "created_at": u.created_at.isoformat() if u.created_at else None,
+                }
+                for u in users
+            ],
+            "next_cursor": users[-1].id if has_more else None,
+        }
     )
 
+
+@app.route("/api/auth/refresh", methods=["POST"])
+@token_required
+def refresh(current_user):
+    token = generate_token(current_user)
+
     return jsonify({"token": token})
 
 
@@ -3,7 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
 import datetime
+import json
 import requests
+from shared.token_auth import TokenVerifier
 
 app = Flask(__name__)
 CORS(app)
@@ -24,6 +26,12 @@ if not AUTH_SERVICE_URL:
 if not USER_SERVICE_URL:
     raise RuntimeError("USER_SERVICE_URL environment variable is required")
 
+# Used to verify JWTs locally; without it every request falls back to auth-service
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# auth-service's /api/auth/users accepts at most this many ids per call
+USER_LOOKUP_CHUNK = int(os.getenv("USER_LOOKUP_CHUNK", "1000"))
+
 db = SQLAlchemy(app)
 
 
@@ -74,21 +82,10 @@ class Transaction(db.Model):
 
 
 # ---------------- HELPERS ----------------
-def verify_token(token):
-    try:
-        res = requests.get(
-            f"{AUTH_SERVICE_URL}/api/auth/verify",
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
-        )
-        if res.status_code == 200:
-            return res.json().get("user")
-    except Exception as e:
-        print(f"Token verification error: {e}")
-    return None
+token_verifier = TokenVerifier(auth_url=AUTH_SERVICE_URL, secret_key=SECRET_KEY)
 
 
-def get_current_user():
+def get_current_user(check_active=False):
     token = request.headers.get("Authorization")
     if not token:
         return None
@@ -96,7 +93,7 @@ def get_current_user():
     if token.startswith("Bearer "):
         token = token[7:]
 
-    return verify_token(token)
+    return token_verifier.verify(token, check_active)
 
 
 def update_request_status(req_id, status, dealer_id=None):
@@ -120,24 +117,51 @@ def update_request_status(req_id, status, dealer_id=None):
         return False
 
 
+def fetch_users(user_ids):
+    """Look up names and phones for many users, one auth-service call per
+    USER_LOOKUP_CHUNK ids. A failed chunk only leaves its own users out"""
+    user_ids = sorted({i for i in user_ids if i})
+    users = {}
+
+    for start in range(0, len(user_ids), USER_LOOKUP_CHUNK):
+        chunk = user_ids[start : start + USER_LOOKUP_CHUNK]
+        try:
+            res = requests.get(
+                f"{AUTH_SERVICE_URL}/api/auth/users",
+                params={"ids": ",".join(str(i) for i in chunk)},
+                headers={"Authorization": request.headers.get("Authorization")},
+                timeout=5,
+            )
+            if res.status_code == 200:
+                users.update({u["id"]: u for u in res.json().get("users", [])})
+            else:
+                print(f"Failed to fetch users: status {res.status_code}")
+        except Exception as e:
+            print(f"Error fetching users: {e}")
+
+    return users
+
+
 def get_all_pending_requests(token):
     """Fetch ALL pending requests from user service"""
     try:
         # FIXED: Don't add "Bearer " if it's already there
         auth_header = token if token and token.startswith("Bearer ") else f"Bearer {token}"
         
-        # Use the new /all endpoint to get all pending requests
+        # Use the new /all endpoint to get all pending requests; the JSON form
+        # is paginated, so stream every row as NDJSON instead
         res = requests.get(
-            f"{USER_SERVICE_URL}/api/users/requests/all?status=pending",
+            f"{USER_SERVICE_URL}/api/users/requests/all",
+            params={"status": "pending", "format": "ndjson"},
             headers={"Authorization": auth_header},
             timeout=5,
+            stream=True,
         )
         
         print(f"DEBUG: Request status code: {res.status_code}")
         
         if res.status_code == 200:
-            data = res.json()
-            pending_requests = data.get("requests", [])
+            pending_requests = [json.loads(line) for line in res.iter_lines() if line]
             print(f"Found {len(pending_requests)} pending requests")
             return pending_requests
         else:
@@ -153,7 +177,17 @@ def get_all_pending_requests(token):
 # ---------------- ROUTES ----------------
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "service": "dealer-service"}), 200
+    return (
+        jsonify(
+            {
+                "status": "healthy",
+                "service": "dealer-service",
+                "token_cache": token_verifier.token_cache.stats(),
+                "revocation_list": token_verifier.revocation_list.stats(),
+            }
+        ),
+        200,
+    )
 
 
 # Dealer Profile Management
@@ -519,11 +553,12 @@ def get_dealer_transactions():
 # Admin: Get All Dealers
 @app.route("/api/admin/dealers", methods=["GET"])
 def get_all_dealers():
-    user = get_current_user()
+    user = get_current_user(check_active=True)
     if not user or user.get("role") != "admin":
         return jsonify({"error": "Unauthorized"}), 401
 
     dealers = DealerProfile.query.all()
+    users = fetch_users(d.dealer_id for d in dealers)
 
     return jsonify(
         {
@@ -531,6 +566,7 @@ def get_all_dealers():
                 {
                     "id": d.id,
                     "dealer_id": d.dealer_id,
+                    "dealer": users.get(d.dealer_id),
                     "vehicle_number": d.vehicle_number,
                     "rating": d.rating,
                     "total_pickups": d.total_pickups,
@@ -546,13 +582,16 @@ def get_all_dealers():
 # Admin: Get All Assignments
 @app.route("/api/admin/assignments", methods=["GET"])
 def get_all_assignments():
-    user = get_current_user()
+    user = get_current_user(check_active=True)
     if not user or user.get("role") != "admin":
         return jsonify({"error": "Unauthorized"}), 401
 
     assignments = RequestAssignment.query.order_by(
         RequestAssignment.assigned_at.desc()
     ).all()
+    users = fetch_users(
+        [a.dealer_id for a in assignments] + [a.user_id for a in assignments]
+    )
 
     return jsonify(
         {
@@ -561,6 +600,9 @@ def get_all_assignments():
                     "id": a.id,
                     "request_id": a.request_id,
                     "dealer_id": a.dealer_id,
+                    "dealer": users.get(a.dealer_id),
+                    "user_id": a.user_id,
+                    "user": users.get(a.user_id),
                     "status": a.status,
                     "assigned_at": a.assigned_at.isoformat(),
                     "accepted_at": a.accepted_at.isoformat() if a.accepted_at else None,
@@ -1,9 +1,35 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    and_,
+    case,
+    create_engine,
+    func,
+    insert,
+    inspect,
+    or_,
+    select,
+    text,
+    update,
+)
+from bisect import bisect_left
 import os
 import datetime
-import requests
+import hashlib
+import random
+import threading
+import time
+from collections import Counter
+import numpy as np
+from shared.token_auth import TokenVerifier
 
 app = Flask(__name__)
 CORS(app)
@@ -22,9 +48,77 @@ if not app.config["SQLALCHEMY_DATABASE_URI"]:
 if not AUTH_SERVICE_URL:
     raise RuntimeError("AUTH_SERVICE_URL environment variable is required")
 
+# Used to verify JWTs locally; without it every request falls back to auth-service
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# How often each worker checks catalog_version for changes made elsewhere
+CATALOG_POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "2"))
+
+MAX_BATCH_QUOTES = int(os.getenv("MAX_BATCH_QUOTES", "1000"))
+
+# Multiplier table: changed rows are merged every poll interval, and the whole
+# table (including deletions and city -> region mappings) is rebuilt less often
+MULTIPLIER_POLL_INTERVAL = float(os.getenv("MULTIPLIER_POLL_INTERVAL", "5"))
+MULTIPLIER_RELOAD_INTERVAL = float(os.getenv("MULTIPLIER_RELOAD_INTERVAL", "300"))
+# Merges re-read rows stamped this many seconds before the high-water mark, so a
+# row whose updated_at predates a later commit is still picked up
+MULTIPLIER_MERGE_OVERLAP = float(os.getenv("MULTIPLIER_MERGE_OVERLAP", "30"))
+
+MAX_BULK_UPDATES = int(os.getenv("MAX_BULK_UPDATES", "5000"))
+MAX_HISTORY_PAGE = 500
+# SQL date formats per bucket; ISO week for MySQL, Monday-based week for SQLite
+HISTORY_BUCKETS = {
+    "day": ("%Y-%m-%d", "%Y-%m-%d"),
+    "week": ("%x-W%v", "%Y-W%W"),
+    "month": ("%Y-%m", "%Y-%m"),
+}
+
+RULES_POLL_INTERVAL = float(os.getenv("RULES_POLL_INTERVAL", "5"))
+
+# Forecasts fit a recency-weighted linear trend to each category's history
+FORECAST_POLL_INTERVAL = float(os.getenv("FORECAST_POLL_INTERVAL", "30"))
+FORECAST_LOOKBACK_DAYS = float(os.getenv("FORECAST_LOOKBACK_DAYS", "365"))
+FORECAST_HALFLIFE_DAYS = float(os.getenv("FORECAST_HALFLIFE_DAYS", "30"))
+FORECAST_MAX_HORIZON_DAYS = 90
+# Expected change beyond which a trend counts as rising/falling
+FORECAST_TREND_BAND = 0.01
+RULE_TYPES = ["tier", "promotion", "min_quantity", "cap"]
+
+# scrap_requests/user_profiles are owned by user-service; they share DATABASE_URL
+# under docker-compose but live in the users database on k8s
+REQUESTS_DATABASE_URL = os.getenv("REQUESTS_DATABASE_URL") or os.getenv(
+    "DATABASE_URL"
+)
+REQUOTE_BATCH_SIZE = int(os.getenv("REQUOTE_BATCH_SIZE", "1000"))
+SIMULATE_BATCH_SIZE = int(os.getenv("SIMULATE_BATCH_SIZE", "5000"))
+
+# Demand engine rewrites city multipliers every DEMAND_INTERVAL seconds; 0 disables it
+DEMAND_INTERVAL = float(os.getenv("DEMAND_INTERVAL", "300"))
+DEMAND_WINDOW_HOURS = int(os.getenv("DEMAND_WINDOW_HOURS", "24"))
+# Rows younger than this may still be uncommitted, so wait before reading them
+DEMAND_LAG_SECONDS = 30
+DEMAND_BATCH_SIZE = 5000
+# (level, demand factor, minimum ratio of city demand to the category's city
+# average); the factor scales the admin-set multiplier, never replaces it
+DEMAND_LEVELS = [
+    ("high", 1.10, 1.5),
+    ("normal", 1.0, 0.5),
+    ("low", 0.95, 0.0),
+]
+
 db = SQLAlchemy(app)
 
 
+# ---- VALIDATION 
+# bool subclasses int, so JSON true/false would otherwise pass as 1 and 0
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
 # ---- MODELS 
 class ScrapCategory(db.Model):
     __tablename__ = "scrap_categories"
@@ -41,6 +135,12 @@ class ScrapCategory(db.Model):
 
 class PriceHistory(db.Model):
     __tablename__ = "price_history"
+    # Serves per-category range scans and keyset pages in changed_at order
+    __table_args__ = (
+        db.Index(
+            "ix_price_history_category_changed", "category_id", "changed_at", "id"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("scrap_categories.id"))
@@ -56,29 +156,80 @@ class DynamicPricing(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     category_id = db.Column(db.Integer, db.ForeignKey("scrap_categories.id"))
     location = db.Column(db.String(100))
+    # Set by admins; the demand engine only writes demand_level/demand_factor
     multiplier = db.Column(db.Float, default=1.0)
     demand_level = db.Column(db.String(20))
+    demand_factor = db.Column(db.Float, default=1.0)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+        index=True,
+    )
+
+
+class RulesVersion(db.Model):
+    """Single row bumped by every pricing rule write, so workers detect stale
+    compiled rules with one primary-key read"""
+
+    __tablename__ = "rules_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
 
 
-# --- HELPERS 
-def verify_token(token):
-    """Ask Auth service to validate JWT"""
-    try:
-        res = requests.get(
-            f"{AUTH_SERVICE_URL}/api/auth/verify",
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
-        )
-        if res.status_code == 200:
-            return res.json().get("user")
-    except Exception:
-        pass
+class PricingRule(db.Model):
+    """Quantity pricing rule for one category, or every category when
+    category_id is null. tier/promotion multiply the price by value once
+    quantity exceeds threshold; min_quantity and cap bound quantity and total"""
 
-    return None
+    __tablename__ = "pricing_rules"
+
+    id = db.Column(db.Integer, primary_key=True)
+    category_id = db.Column(
+        db.Integer, db.ForeignKey("scrap_categories.id"), index=True
+    )
+    rule_type = db.Column(db.String(20), nullable=False)
+    threshold = db.Column(db.Float, default=0.0)
+    value = db.Column(db.Float, nullable=False)
+    starts_at = db.Column(db.DateTime)
+    ends_at = db.Column(db.DateTime)
+    is_active = db.Column(db.Boolean, default=True)
+    created_by = db.Column(db.Integer)
+    updated_at = db.Column(
+        db.DateTime,
+        default=datetime.datetime.utcnow,
+        onupdate=datetime.datetime.utcnow,
+    )
+
+
+class LocationRegion(db.Model):
+    """Maps a city to the region whose multipliers it falls back to"""
+
+    __tablename__ = "location_regions"
+
+    id = db.Column(db.Integer, primary_key=True)
+    city = db.Column(db.String(100), unique=True, nullable=False)
+    region = db.Column(db.String(100), nullable=False)
+
+
+class CatalogVersion(db.Model):
+    """Single row bumped whenever categories change, so every worker can
+    detect a stale catalog snapshot with one primary-key read"""
+
+    __tablename__ = "catalog_version"
+
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+
+# --- HELPERS 
+token_verifier = TokenVerifier(auth_url=AUTH_SERVICE_URL, secret_key=SECRET_KEY)
 
 
-def require_auth():
+def require_auth(check_active=False):
     token = request.headers.get("Authorization")
     if not token:
         return None
@@ -86,48 +237,1171 @@ def require_auth():
     if token.startswith("Bearer "):
         token = token[7:]
 
-    return verify_token(token)
+    return token_verifier.verify(token, check_active)
+
+
+# ---- CATALOG CACHE 
+def serialize_category(c):
+    return {
+        "id": c.id,
+        "name": c.name,
+        "base_price": c.base_price,
+        "unit": c.unit,
+        "description": c.description,
+        "image_url": c.image_url,
+    }
+
+
+class CategoryCatalog:
+    """In-memory snapshot of scrap_categories with pre-serialized responses.
+    Reloaded when catalog_version moves, checked every poll_interval seconds"""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self.version = None
+        self.categories = {}
+        self._list_body = None
+        self._bodies = {}
+        self._next_check = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._next_check = 0
+        self.version = None
+
+    def snapshot(self):
+        if time.time() >= self._next_check:
+            with self._lock:
+                if time.time() >= self._next_check:
+                    version = CatalogVersion.query.get(1)
+                    version = version.version if version else 0
+                    if version != self.version:
+                        self._load(version)
+                    self._next_check = time.time() + self.poll_interval
+        return self
+
+    def _load(self, version):
+        rows = ScrapCategory.query.order_by(ScrapCategory.id).all()
+        categories = {
+            c.id: dict(serialize_category(c), is_active=c.is_active) for c in rows
+        }
+        bodies = {c.id: body_with_etag(serialize_category(c)) for c in rows}
+        active = [serialize_category(c) for c in rows if c.is_active]
+
+        self.categories = categories
+        self._bodies = bodies
+        self._list_body = body_with_etag({"categories": active})
+        self.version = version
+
+    def list_body(self):
+        return self._list_body
+
+    def category_body(self, category_id):
+        return self._bodies.get(category_id)
+
+
+def body_with_etag(payload):
+    body = app.json.dumps(payload)
+    return body, hashlib.sha256(body.encode()).hexdigest()[:32]
+
+
+def bump_catalog_version():
+    """Bump catalog_version inside the caller's transaction"""
+    updated = CatalogVersion.query.filter_by(id=1).update(
+        {
+            CatalogVersion.version: CatalogVersion.version + 1,
+            CatalogVersion.updated_at: datetime.datetime.utcnow(),
+        }
+    )
+    if not updated:
+        db.session.add(CatalogVersion(id=1, version=1))
+
+
+def bump_rules_version():
+    """Bump rules_version inside the caller's transaction"""
+    updated = RulesVersion.query.filter_by(id=1).update(
+        {
+            RulesVersion.version: RulesVersion.version + 1,
+            RulesVersion.updated_at: datetime.datetime.utcnow(),
+        }
+    )
+    if not updated:
+        db.session.add(RulesVersion(id=1, version=1))
+
+
+def conditional_json(body, etag):
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
+
+
+category_catalog = CategoryCatalog(poll_interval=CATALOG_POLL_INTERVAL)
+
+
+# ---- MULTIPLIER TABLE 
+def normalize_location(location):
+    """Fold case and whitespace so "Pune", " pune " and "PUNE" share a key"""
+    if not isinstance(location, str):
+        return "default"
+    return " ".join(location.split()).casefold() or "default"
+
+
+class MultiplierTable:
+    """In-memory dynamic_pricing keyed by (category_id, normalized location).
+    Lookups fall back city -> region -> default -> 1.0 with no database access"""
+
+    def __init__(self, poll_interval, reload_interval):
+        self.poll_interval = poll_interval
+        self.reload_interval = reload_interval
+        self._multipliers = {}
+        self._regions = {}
+        self._high_water = None
+        self._next_poll = 0
+        self._next_reload = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._next_poll = 0
+        self._next_reload = 0
+
+    def refresh(self):
+        if time.time() < self._next_poll:
+            return
+
+        # Only one thread refreshes; the rest keep using the current table
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            if time.time() >= self._next_reload:
+                self._reload()
+            else:
+                self._merge_changes()
+            self._next_poll = time.time() + self.poll_interval
+        except Exception as e:
+            print(f"Multiplier refresh error: {e}")
+        finally:
+            self._lock.release()
+
+    def _reload(self):
+        multipliers = {}
+        rows = DynamicPricing.query.order_by(DynamicPricing.id).all()
+        self._apply(multipliers, rows)
+
+        self._regions = {
+            normalize_location(r.city): normalize_location(r.region)
+            for r in LocationRegion.query.all()
+        }
+        self._multipliers = multipliers
+        self._next_reload = time.time() + self.reload_interval
+
+    def _merge_changes(self):
+        query = DynamicPricing.query
+        # No high-water mark yet (the table was empty): read it all again.
+        # Otherwise re-read an overlap window for late commits; merging is
+        # idempotent, so rows seen before are simply applied again
+        if self._high_water:
+            since = self._high_water - datetime.timedelta(
+                seconds=MULTIPLIER_MERGE_OVERLAP
+            )
+            query = query.filter(DynamicPricing.updated_at >= since)
+        rows = query.order_by(DynamicPricing.id).all()
+        if rows:
+            multipliers = dict(self._multipliers)
+            self._apply(multipliers, rows)
+            self._multipliers = multipliers
+
+    def _apply(self, multipliers, rows):
+        for row in rows:
+            key = (row.category_id, normalize_location(row.location))
+            # Lowest id wins when several rows normalize to the same key
+            current = multipliers.get(key)
+            if current is None or current[0] >= row.id:
+                effective = (row.multiplier or 1.0) * (row.demand_factor or 1.0)
+                multipliers[key] = (row.id, effective)
+
+            if row.updated_at and (
+                self._high_water is None or row.updated_at > self._high_water
+            ):
+                self._high_water = row.updated_at
+
+    def lookup(self, category_id, location, overrides=None):
+        """Multiplier for a location; `overrides` maps (category_id, normalized
+        location) to proposed multipliers that shadow the table's rows"""
+        self.refresh()
+
+        city = normalize_location(location)
+        multipliers = self._multipliers
+        for key in (city, self._regions.get(city), "default"):
+            if not key:
+                continue
+            if overrides and (category_id, key) in overrides:
+                return overrides[(category_id, key)]
+            entry = multipliers.get((category_id, key))
+            if entry:
+                return entry[1]
+
+        return 1.0
+
+    def export(self):
+        """Rows and region map for pricing snapshots, keyed by normalized names"""
+        self.refresh()
+        return self._multipliers, self._regions
+
+    def stats(self):
+        return {
+            "size": len(self._multipliers),
+            "regions": len(self._regions),
+            "high_water": self._high_water.isoformat() if self._high_water else None,
+        }
+
+
+multiplier_table = MultiplierTable(
+    poll_interval=MULTIPLIER_POLL_INTERVAL,
+    reload_interval=MULTIPLIER_RELOAD_INTERVAL,
+)
+
+
+# ---- PRICING RULES 
+class QuoteError(Exception):
+    """A pricing rule rejects the quote, e.g. below the minimum quantity"""
+
+
+# Applied to categories with no tier rules: 5% bonus above 100 units
+DEFAULT_TIERS = ([100.0], [1.05])
+
+
+class CompiledRules:
+    """Active pricing rules flattened per category into sorted threshold
+    arrays, so pricing a quote is a couple of binary searches"""
+
+    def __init__(self, tiers=None, promotions=None, min_quantity=None, caps=None):
+        self.tiers = tiers or {}
+        self.promotions = promotions or {}
+        self.min_quantity = min_quantity or {}
+        self.caps = caps or {}
+
+    def minimum(self, category_id):
+        return self.min_quantity.get(category_id, self.min_quantity.get(None))
+
+    def apply(self, category_id, base_price, quantity, multiplier):
+        min_quantity = self.minimum(category_id)
+        if min_quantity and quantity < min_quantity:
+            raise QuoteError(f"Minimum quantity is {min_quantity}")
+
+        # Highest tier whose threshold the quantity exceeds
+        thresholds, bonuses = (
+            self.tiers.get(category_id) or self.tiers.get(None) or DEFAULT_TIERS
+        )
+        i = bisect_left(thresholds, quantity)
+        if i:
+            multiplier *= bonuses[i - 1]
+
+        # Product of every promotion whose threshold the quantity exceeds
+        promotions = self.promotions.get(category_id, self.promotions.get(None))
+        if promotions:
+            i = bisect_left(promotions[0], quantity)
+            if i:
+                multiplier *= promotions[1][i - 1]
+
+        total = base_price * quantity * multiplier
+        cap = self.caps.get(category_id, self.caps.get(None))
+        if cap is not None and total > cap:
+            total = cap
+
+        # np.round like apply_many, so single and batch quotes agree to the cent
+        return multiplier, float(np.round(total, 2))
+
+    def apply_many(self, category_id, base_price, quantities, multipliers):
+        """apply() over arrays of one category's quantities and multipliers.
+        Returns (effective multipliers, totals, accepted); rejected quotes
+        total 0"""
+        accepted = np.ones(len(quantities), dtype=bool)
+        min_quantity = self.minimum(category_id)
+        if min_quantity:
+            accepted = quantities >= min_quantity
+
+        # searchsorted(side="left") picks the same tier as bisect_left
+        thresholds, bonuses = (
+            self.tiers.get(category_id) or self.tiers.get(None) or DEFAULT_TIERS
+        )
+        factors = np.concatenate(([1.0], bonuses))
+        multipliers = multipliers * factors[np.searchsorted(thresholds, quantities)]
+
+        promotions = self.promotions.get(category_id, self.promotions.get(None))
+        if promotions:
+            factors = np.concatenate(([1.0], promotions[1]))
+            multipliers *= factors[np.searchsorted(promotions[0], quantities)]
+
+        totals = base_price * quantities * multipliers
+        cap = self.caps.get(category_id, self.caps.get(None))
+        if cap is not None:
+            totals = np.minimum(totals, cap)
+
+        return multipliers, np.where(accepted, np.round(totals, 2), 0.0), accepted
+
+    def serialize(self):
+        """JSON-safe form for pricing snapshots; a null category_id applies to
+        every category without its own entry"""
+        return {
+            "tiers": [
+                {"category_id": c, "thresholds": t, "values": v}
+                for c, (t, v) in self.tiers.items()
+            ],
+            "promotions": [
+                {"category_id": c, "thresholds": t, "values": v}
+                for c, (t, v) in self.promotions.items()
+            ],
+            "min_quantity": [
+                {"category_id": c, "value": v} for c, v in self.min_quantity.items()
+            ],
+            "caps": [{"category_id": c, "value": v} for c, v in self.caps.items()],
+            "default_tiers": {
+                "thresholds": DEFAULT_TIERS[0],
+                "values": DEFAULT_TIERS[1],
+            },
+        }
+
+
+def compile_rules(rules, now):
+    """Compile the rules in effect at `now`; also return the next time a rule
+    window opens or closes, when the compiled set must be rebuilt"""
+    next_boundary = None
+    by_type = {rule_type: {} for rule_type in RULE_TYPES}
+
+    for rule in rules:
+        for boundary in (rule.starts_at, rule.ends_at):
+            if boundary and boundary > now:
+                next_boundary = min(next_boundary or boundary, boundary)
+
+        if rule.starts_at and rule.starts_at > now:
+            continue
+        if rule.ends_at and rule.ends_at <= now:
+            continue
+        if rule.rule_type in by_type:
+            by_type[rule.rule_type].setdefault(rule.category_id, []).append(rule)
+
+    tiers = {}
+    for category_id, group in by_type["tier"].items():
+        group.sort(key=lambda r: (r.threshold or 0.0, r.id))
+        tiers[category_id] = (
+            [r.threshold or 0.0 for r in group],
+            [r.value for r in group],
+        )
+
+    # Category promotions stack on top of global ones
+    promotions = {}
+    global_promotions = by_type["promotion"].get(None, [])
+    for category_id, group in by_type["promotion"].items():
+        if category_id is not None:
+            group = group + global_promotions
+        group.sort(key=lambda r: (r.threshold or 0.0, r.id))
+
+        thresholds, products, product = [], [], 1.0
+        for r in group:
+            product *= r.value
+            thresholds.append(r.threshold or 0.0)
+            products.append(product)
+        promotions[category_id] = (thresholds, products)
+
+    min_quantity = {
+        category_id: max(r.value for r in group)
+        for category_id, group in by_type["min_quantity"].items()
+    }
+    caps = {
+        category_id: min(r.value for r in group)
+        for category_id, group in by_type["cap"].items()
+    }
+
+    return CompiledRules(tiers, promotions, min_quantity, caps), next_boundary
+
+
+class PricingRules:
+    """Hot-reloaded CompiledRules. Each poll reads rules_version and
+    recompiles only when it moved or a rule window opened or closed"""
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self._compiled = CompiledRules()
+        self._signature = None
+        self._next_boundary = None
+        self._next_poll = 0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._next_poll = 0
+        self._signature = None
+
+    def _due(self):
+        if time.time() >= self._next_poll:
+            return True
+        return bool(
+            self._next_boundary and datetime.datetime.utcnow() >= self._next_boundary
+        )
+
+    def compiled(self):
+        if self._due():
+            with self._lock:
+                if self._due():
+                    self._refresh()
+        return self._compiled
+
+    def _refresh(self):
+        now = datetime.datetime.utcnow()
+        try:
+            version = RulesVersion.query.get(1)
+            signature = version.version if version else 0
+            boundary_passed = self._next_boundary and now >= self._next_boundary
+
+            if signature != self._signature or boundary_passed:
+                rules = PricingRule.query.filter_by(is_active=True).all()
+                self._compiled, self._next_boundary = compile_rules(rules, now)
+                self._signature = signature
+        except Exception as e:
+            # Keep pricing with the last compiled rules
+            print(f"Pricing rules refresh error: {e}")
+
+        self._next_poll = time.time() + self.poll_interval
+
+
+pricing_rules = PricingRules(poll_interval=RULES_POLL_INTERVAL)
+
+
+class PricingSnapshot:
+    """Everything needed to quote outside this service: base prices, multiplier
+    rows, regions and compiled rules as one body with an ETag. The body is
+    rebuilt only when one of the underlying tables was swapped out"""
+
+    def __init__(self):
+        # Catalog version and the tables the body was built from, held so
+        # they are compared by identity rather than by reusable id()s
+        self._version = None
+        self._sources = None
+        self._body = None
+        self._lock = threading.Lock()
+
+    def body(self):
+        catalog = category_catalog.snapshot()
+        version, categories = catalog.version, catalog.categories
+        multipliers, regions = multiplier_table.export()
+        rules = pricing_rules.compiled()
+        sources = (categories, multipliers, regions, rules)
+
+        with self._lock:
+            if (
+                self._sources is None
+                or version != self._version
+                or any(new is not old for new, old in zip(sources, self._sources))
+            ):
+                self._body = body_with_etag(
+                    {
+                        "version": version,
+                        "categories": [
+                            {"id": c["id"], "base_price": c["base_price"]}
+                            for c in categories.values()
+                        ],
+                        "multipliers": [
+                            {"category_id": c, "location": loc, "multiplier": m}
+                            for (c, loc), (_, m) in multipliers.items()
+                        ],
+                        "regions": regions,
+                        "rules": rules.serialize(),
+                    }
+                )
+                self._version = version
+                self._sources = sources
+            return self._body
+
+
+pricing_snapshot = PricingSnapshot()
+
+
+def compute_quote(category_id, base_price, quantity, multiplier):
+    """Apply pricing rules and return (effective multiplier, rounded total)"""
+    rules = pricing_rules.compiled()
+    return rules.apply(category_id, base_price, quantity, multiplier)
+
+
+def serialize_rule(r):
+    return {
+        "id": r.id,
+        "category_id": r.category_id,
+        "rule_type": r.rule_type,
+        "threshold": r.threshold,
+        "value": r.value,
+        "starts_at": r.starts_at.isoformat() if r.starts_at else None,
+        "ends_at": r.ends_at.isoformat() if r.ends_at else None,
+        "is_active": r.is_active,
+    }
+
+
+def apply_rule_fields(rule, data):
+    """Copy rule fields from a request body, returning an error message if invalid"""
+    rule_type = data.get("rule_type", rule.rule_type)
+    if rule_type not in RULE_TYPES:
+        return f"rule_type must be one of {', '.join(RULE_TYPES)}"
+
+    value = data.get("value", rule.value)
+    if not is_number(value) or value <= 0:
+        return "value must be a positive number"
+
+    try:
+        for field in ("starts_at", "ends_at"):
+            if field in data:
+                value_at = data[field]
+                setattr(
+                    rule,
+                    field,
+                    datetime.datetime.fromisoformat(value_at) if value_at else None,
+                )
+    except (TypeError, ValueError):
+        return "starts_at and ends_at must be ISO 8601 datetimes"
+
+    threshold = data.get("threshold", rule.threshold or 0.0)
+    if not is_number(threshold) or threshold < 0:
+        return "threshold must be a non-negative number"
+
+    category_id = data.get("category_id", rule.category_id)
+    if category_id is not None and (
+        not is_integer(category_id) or not ScrapCategory.query.get(category_id)
+    ):
+        return "category_id must be an existing category or null"
+
+    rule.rule_type = rule_type
+    rule.value = value
+    rule.category_id = category_id
+    rule.threshold = threshold
+    rule.is_active = data.get("is_active", rule.is_active is not False)
+    return None
+
+
+# ---- USER-SERVICE TABLES 
+# Views of user-service tables, kept off db.metadata so db.create_all()
+# never creates them here
+requests_metadata = MetaData()
+scrap_requests_table = Table(
+    "scrap_requests",
+    requests_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("category_id", Integer),
+    Column("quantity", Float),
+    Column("estimated_price", Float),
+    Column("status", String(20)),
+    Column("assigned_dealer_id", Integer),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+user_profiles_table = Table(
+    "user_profiles",
+    requests_metadata,
+    Column("user_id", Integer),
+    Column("city", String(100)),
+)
+# user-service's outbox; requotes add their events in the same transaction
+request_events_table = Table(
+    "request_events",
+    requests_metadata,
+    Column("id", Integer, primary_key=True),
+    Column("request_id", Integer),
+    Column("user_id", Integer),
+    Column("category_id", Integer),
+    Column("event_type", String(20)),
+    Column("old_status", String(20)),
+    Column("status", String(20)),
+    Column("estimated_price", Float),
+    Column("assigned_dealer_id", Integer),
+    Column("created_at", DateTime),
+)
+
+requests_engine = None
+requests_engine_lock = threading.Lock()
+
+
+def get_requests_engine():
+    global requests_engine
+    with requests_engine_lock:
+        if requests_engine is None:
+            requests_engine = create_engine(REQUESTS_DATABASE_URL, pool_pre_ping=True)
+        return requests_engine
+
+
+def requote_pending(category_ids):
+    """Re-price pending scrap_requests of the given categories in-process.
+    Walks each category in id order, REQUOTE_BATCH_SIZE rows per transaction,
+    and rewrites only estimates that changed so locks stay short. Each change
+    writes a "requoted" request_events row in the same transaction, so event
+    feeds and streams see the new estimate"""
+    r, p = scrap_requests_table, user_profiles_table
+    categories = category_catalog.snapshot().categories
+    engine = get_requests_engine()
+    updated = 0
+
+    for category_id in sorted(set(category_ids)):
+        category = categories.get(category_id)
+        if not category:
+            continue
+
+        last_id = 0
+        while True:
+            with engine.begin() as conn:
+                # Locked so a request can't leave pending between the read
+                # and the update, which would leave an event for a stale row
+                rows = conn.execute(
+                    select(
+                        r.c.id,
+                        r.c.user_id,
+                        r.c.quantity,
+                        r.c.estimated_price,
+                        r.c.assigned_dealer_id,
+                        p.c.city,
+                    )
+                    .select_from(r.outerjoin(p, p.c.user_id == r.c.user_id))
+                    .where(
+                        r.c.category_id == category_id,
+                        r.c.status == "pending",
+                        r.c.id > last_id,
+                    )
+                    .order_by(r.c.id)
+                    .limit(REQUOTE_BATCH_SIZE)
+                    .with_for_update(of=r)
+                ).all()
+
+                prices = {}
+                for row in rows:
+                    try:
+                        _, total = compute_quote(
+                            category_id,
+                            category["base_price"],
+                            row.quantity,
+                            multiplier_table.lookup(category_id, row.city),
+                        )
+                    except QuoteError:
+                        continue
+                    if total != row.estimated_price:
+                        prices[row.id] = total
+
+                if prices:
+                    now = datetime.datetime.utcnow()
+                    conn.execute(
+                        update(r)
+                        .where(r.c.id.in_(prices), r.c.status == "pending")
+                        .values(
+                            estimated_price=case(prices, value=r.c.id),
+                            updated_at=now,
+                        )
+                    )
+                    conn.execute(
+                        insert(request_events_table),
+                        [
+                            {
+                                "request_id": row.id,
+                                "user_id": row.user_id,
+                                "category_id": category_id,
+                                "event_type": "requoted",
+                                "old_status": "pending",
+                                "status": "pending",
+                                "estimated_price": prices[row.id],
+                                "assigned_dealer_id": row.assigned_dealer_id,
+                                "created_at": now,
+                            }
+                            for row in rows
+                            if row.id in prices
+                        ],
+                    )
+                    updated += len(prices)
+
+            if len(rows) < REQUOTE_BATCH_SIZE:
+                break
+            last_id = rows[-1].id
+
+    return updated
+
+
+def simulate_pending(prices, multipliers):
+    """Price the pending book under proposed base prices and multiplier
+    overrides, one category at a time in SIMULATE_BATCH_SIZE id ranges.
+    Each batch is priced as arrays and rolled up per city; yields one
+    (category_id, base_price, {city: [requests, rejected, current, simulated]})
+    per category with pending requests"""
+    r, p = scrap_requests_table, user_profiles_table
+    categories = category_catalog.snapshot().categories
+    rules = pricing_rules.compiled()
+    engine = get_requests_engine()
+
+    for category_id in sorted(categories):
+        base_price = prices.get(category_id, categories[category_id]["base_price"])
+        cities = {}
+        last_id = 0
+        while True:
+            with engine.connect() as conn:
+                rows = conn.execute(
+                    select(r.c.id, r.c.quantity, r.c.estimated_price, p.c.city)
+                    .select_from(r.outerjoin(p, p.c.user_id == r.c.user_id))
+                    .where(
+                        r.c.category_id == category_id,
+                        r.c.status == "pending",
+                        r.c.id > last_id,
+                    )
+                    .order_by(r.c.id)
+                    .limit(SIMULATE_BATCH_SIZE)
+                ).all()
+            if not rows:
+                break
+
+            quantities = np.array([row.quantity or 0.0 for row in rows])
+            current = np.array([row.estimated_price or 0.0 for row in rows])
+            keys, city_index = np.unique(
+                [normalize_location(row.city) for row in rows], return_inverse=True
+            )
+            city_multipliers = np.array(
+                [multiplier_table.lookup(category_id, k, multipliers) for k in keys]
+            )
+
+            _, totals, accepted = rules.apply_many(
+                category_id, base_price, quantities, city_multipliers[city_index]
+            )
+
+            count = len(keys)
+            sums = zip(
+                np.bincount(city_index, minlength=count),
+                np.bincount(city_index, ~accepted, count),
+                np.bincount(city_index, current, count),
+                np.bincount(city_index, totals, count),
+            )
+            for key, batch in zip(keys, sums):
+                totals_for_city = cities.setdefault(str(key), [0, 0, 0.0, 0.0])
+                for i, value in enumerate(batch):
+                    totals_for_city[i] += value
+
+            if len(rows) < SIMULATE_BATCH_SIZE:
+                break
+            last_id = rows[-1].id
+
+        if cities:
+            yield category_id, base_price, cities
+
+
+def requote_in_background(category_ids):
+    def run():
+        with app.app_context():
+            try:
+                updated = requote_pending(category_ids)
+                print(f"[requote] Updated {updated} pending requests")
+            except Exception as e:
+                print(f"Requote error: {e}")
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+# ---- DEMAND ENGINE 
+
+
+class DemandEngine:
+    """Rolling per-(category, city) request counts in hourly buckets, fed
+    incrementally from scrap_requests past a (created_at, id) high-water mark.
+    Each run turns the counts into demand levels and writes back only the
+    dynamic_pricing rows whose level or multiplier changed"""
+
+    def __init__(self, interval, window_hours):
+        self.interval = interval
+        self.window = datetime.timedelta(hours=window_hours)
+        self._buckets = {}
+        self._cities = {}
+        self._high_water = None
+        self.last_run = None
+        self.rows_written = 0
+
+    def start(self):
+        if self.interval <= 0:
+            return
+
+        thread = threading.Thread(target=self._loop, daemon=True)
+        thread.start()
+
+    def _loop(self):
+        while True:
+            # Jitter keeps workers that started together from contending
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+            with app.app_context():
+                try:
+                    self.run()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Demand engine error: {e}")
+                finally:
+                    db.session.remove()
+
+    def run(self):
+        # One worker per cluster writes at a time; the others skip this cycle
+        # and catch up from their own high-water mark when they next hold it
+        with db.engine.connect() as lock_conn:
+            if db.engine.dialect.name == "mysql":
+                locked = lock_conn.execute(
+                    text("SELECT GET_LOCK('scrapzee_demand_engine', 0)")
+                ).scalar()
+                if not locked:
+                    return
+
+            try:
+                now = datetime.datetime.utcnow()
+                self._ingest(now)
+                self._prune(now)
+                self.rows_written += self._write(self._compute())
+                self.last_run = now
+            finally:
+                if db.engine.dialect.name == "mysql":
+                    lock_conn.execute(
+                        text("SELECT RELEASE_LOCK('scrapzee_demand_engine')")
+                    )
+
+    def _ingest(self, now):
+        upper = now - datetime.timedelta(seconds=DEMAND_LAG_SECONDS)
+        if self._high_water is None:
+            self._high_water = (now - self.window, 0)
+
+        r, p = scrap_requests_table, user_profiles_table
+        with get_requests_engine().connect() as conn:
+            while True:
+                hw_created, hw_id = self._high_water
+                rows = conn.execute(
+                    select(r.c.id, r.c.category_id, r.c.created_at, p.c.city)
+                    .select_from(r.outerjoin(p, p.c.user_id == r.c.user_id))
+                    .where(
+                        or_(
+                            r.c.created_at > hw_created,
+                            and_(r.c.created_at == hw_created, r.c.id > hw_id),
+                        ),
+                        r.c.created_at <= upper,
+                    )
+                    .order_by(r.c.created_at, r.c.id)
+                    .limit(DEMAND_BATCH_SIZE)
+                ).all()
+
+                for row in rows:
+                    city = normalize_location(row.city)
+                    if city == "default":
+                        continue
+
+                    self._cities.setdefault(city, " ".join(row.city.split()))
+                    bucket = row.created_at.replace(minute=0, second=0, microsecond=0)
+                    self._buckets.setdefault(bucket, Counter())[
+                        (row.category_id, city)
+                    ] += 1
+
+                if rows:
+                    self._high_water = (rows[-1].created_at, rows[-1].id)
+                if len(rows) < DEMAND_BATCH_SIZE:
+                    break
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        for bucket in [b for b in self._buckets if b < cutoff]:
+            del self._buckets[bucket]
+
+    def _compute(self):
+        counts = Counter()
+        for bucket in self._buckets.values():
+            counts.update(bucket)
+
+        by_category = {}
+        for (category_id, city), count in counts.items():
+            by_category.setdefault(category_id, {})[city] = count
+
+        levels = {}
+        for category_id, cities in by_category.items():
+            average = sum(cities.values()) / len(cities)
+            for city, count in cities.items():
+                ratio = count / average
+                for level, factor, min_ratio in DEMAND_LEVELS:
+                    if ratio >= min_ratio:
+                        levels[(category_id, city)] = (level, factor)
+                        break
+
+        return levels
+
+    def _write(self, levels):
+        managed = {level for level, _, _ in DEMAND_LEVELS}
+        rows = (
+            DynamicPricing.query.filter(
+                or_(
+                    DynamicPricing.category_id.in_({c for c, _ in levels}),
+                    DynamicPricing.demand_level.in_(managed - {"normal"}),
+                )
+            )
+            .order_by(DynamicPricing.id)
+            .all()
+        )
+
+        seen = set()
+        changed = 0
+        for row in rows:
+            key = (row.category_id, normalize_location(row.location))
+            if key in levels:
+                level, factor = levels[key]
+                seen.add(key)
+            elif row.demand_level in managed and row.demand_level != "normal":
+                # Demand for this city dropped out of the window
+                level, factor = "normal", 1.0
+            else:
+                continue
+
+            # row.multiplier belongs to admins and is left as set
+            if row.demand_level != level or (row.demand_factor or 1.0) != factor:
+                row.demand_level = level
+                row.demand_factor = factor
+                changed += 1
+
+        for key, (level, factor) in levels.items():
+            if key not in seen and level != "normal":
+                category_id, city = key
+                db.session.add(
+                    DynamicPricing(
+                        category_id=category_id,
+                        location=self._cities.get(city, city),
+                        multiplier=1.0,
+                        demand_level=level,
+                        demand_factor=factor,
+                    )
+                )
+                changed += 1
+
+        if changed:
+            db.session.commit()
+            multiplier_table.invalidate()
+
+        return changed
+
+    def stats(self):
+        return {
+            "enabled": self.interval > 0,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "high_water": (
+                self._high_water[0].isoformat() if self._high_water else None
+            ),
+            "rows_written": self.rows_written,
+        }
+
+
+demand_engine = DemandEngine(
+    interval=DEMAND_INTERVAL,
+    window_hours=DEMAND_WINDOW_HOURS,
+)
+
+
+# ---- PRICE FORECAST 
+def days_since_epoch(moment):
+    return (moment - datetime.datetime(1970, 1, 1)).total_seconds() / 86400.0
+
+
+class PriceForecaster:
+    """Fits a linear price trend per category over price_history, weighting
+    each change by an exponential decay on its age. All categories are fitted
+    in one NumPy pass of grouped weighted sums; the fit is redone only when
+    rows past the last seen id arrive"""
+
+    def __init__(self, poll_interval, lookback_days, halflife_days):
+        self.poll_interval = poll_interval
+        self.lookback_days = lookback_days
+        self.halflife_days = halflife_days
+        self._categories = np.empty(0, dtype=np.int64)
+        self._times = np.empty(0, dtype=np.float64)
+        self._prices = np.empty(0, dtype=np.float64)
+        self._last_id = 0
+        self._next_poll = 0
+        self._fit = None
+        self._lock = threading.Lock()
+
+    def fit(self):
+        if time.time() >= self._next_poll:
+            with self._lock:
+                if time.time() >= self._next_poll:
+                    if self._load_new():
+                        self._fit = self._refit()
+                    self._next_poll = time.time() + self.poll_interval
+        return self._fit
+
+    def _load_new(self):
+        now = datetime.datetime.utcnow()
+        since = now - datetime.timedelta(days=self.lookback_days)
+        rows = (
+            db.session.query(
+                PriceHistory.id,
+                PriceHistory.category_id,
+                PriceHistory.changed_at,
+                PriceHistory.price,
+            )
+            .filter(
+                PriceHistory.id > self._last_id,
+                PriceHistory.category_id.isnot(None),
+                PriceHistory.changed_at >= since,
+            )
+            .order_by(PriceHistory.id)
+            .all()
+        )
+        if not rows:
+            return False
+
+        self._last_id = rows[-1].id
+        categories = np.concatenate(
+            [self._categories, np.array([r.category_id for r in rows], np.int64)]
+        )
+        times = np.concatenate(
+            [self._times, np.array([days_since_epoch(r.changed_at) for r in rows])]
+        )
+        prices = np.concatenate(
+            [self._prices, np.array([r.price for r in rows], np.float64)]
+        )
+
+        cutoff = days_since_epoch(now) - self.lookback_days
+        keep = times >= cutoff
+        order = np.argsort(times[keep], kind="stable")
+        self._categories = categories[keep][order]
+        self._times = times[keep][order]
+        self._prices = prices[keep][order]
+        return True
+
+    def _refit(self):
+        if not len(self._times):
+            return None
+
+        categories, group = np.unique(self._categories, return_inverse=True)
+        count = len(categories)
+
+        # Rows are in time order, so the last index per group is its latest change
+        last_index = np.zeros(count, dtype=np.int64)
+        np.maximum.at(last_index, group, np.arange(len(group)))
+        last_time = self._times[last_index]
+
+        # Time relative to each category's latest change keeps the sums stable
+        t = self._times - last_time[group]
+        w = 0.5 ** (-t / self.halflife_days)
+        p = self._prices
+
+        sw = np.bincount(group, w, count)
+        swt = np.bincount(group, w * t, count)
+        swp = np.bincount(group, w * p, count)
+        swtt = np.bincount(group, w * t * t, count)
+        swtp = np.bincount(group, w * t * p, count)
+
+        denom = sw * swtt - swt * swt
+        safe = np.abs(denom) > 1e-9
+        slope = np.zeros(count)
+        slope[safe] = (sw[safe] * swtp[safe] - swt[safe] * swp[safe]) / denom[safe]
+        intercept = (swp - slope * swt) / sw
+
+        return {
+            "categories": categories,
+            "slope": slope,
+            "intercept": intercept,
+            "last_time": last_time,
+            "last_price": p[last_index],
+            "points": np.bincount(group, minlength=count),
+        }
+
+    def stats(self):
+        fit = self._fit
+        return {
+            "rows": len(self._times),
+            "categories": 0 if fit is None else len(fit["categories"]),
+            "last_id": self._last_id,
+        }
+
+    def forecast(self, horizon_days, category_ids=None):
+        fit = self.fit()
+        if fit is None:
+            return []
+
+        mask = np.ones(len(fit["categories"]), dtype=bool)
+        if category_ids is not None:
+            mask = np.isin(fit["categories"], list(category_ids))
+
+        categories = fit["categories"][mask]
+        slope = fit["slope"][mask]
+        points = fit["points"][mask]
+        current = fit["last_price"][mask]
+
+        now = days_since_epoch(datetime.datetime.utcnow())
+        elapsed = now - fit["last_time"][mask]
+        predicted = np.maximum(
+            fit["intercept"][mask] + slope * (elapsed + horizon_days), 0.0
+        )
+        change = np.where(current > 0, (predicted - current) / current, 0.0)
+
+        return [
+            {
+                "category_id": category_id,
+                "current_price": price,
+                "forecast_price": round(forecast_price, 2),
+                "slope_per_day": round(per_day, 4),
+                "expected_change": round(expected, 4),
+                "trend": (
+                    "rising"
+                    if expected > FORECAST_TREND_BAND
+                    else "falling" if expected < -FORECAST_TREND_BAND else "stable"
+                ),
+                "points": count,
+            }
+            for category_id, price, forecast_price, per_day, expected, count in zip(
+                categories.tolist(),
+                current.tolist(),
+                predicted.tolist(),
+                slope.tolist(),
+                change.tolist(),
+                points.tolist(),
+            )
+        ]
+
+
+price_forecaster = PriceForecaster(
+    poll_interval=FORECAST_POLL_INTERVAL,
+    lookback_days=FORECAST_LOOKBACK_DAYS,
+    halflife_days=FORECAST_HALFLIFE_DAYS,
+)
 
 
 # ---- ROUTES 
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "service": "pricing-service"}), 200
+    return (
+        jsonify(
+            {
+                "status": "healthy",
+                "service": "pricing-service",
+                "token_cache": token_verifier.token_cache.stats(),
+                "multiplier_table": multiplier_table.stats(),
+                "demand_engine": demand_engine.stats(),
+                "price_forecaster": price_forecaster.stats(),
+                "revocation_list": token_verifier.revocation_list.stats(),
+            }
+        ),
+        200,
+    )
 
 
 @app.route("/api/pricing/categories", methods=["GET"])
 def get_categories():
-    categories = ScrapCategory.query.filter_by(is_active=True).all()
-    return jsonify(
-        {
-            "categories": [
-                {
-                    "id": c.id,
-                    "name": c.name,
-                    "base_price": c.base_price,
-                    "unit": c.unit,
-                    "description": c.description,
-                    "image_url": c.image_url,
-                }
-                for c in categories
-            ]
-        }
-    )
+    body, etag = category_catalog.snapshot().list_body()
+    return conditional_json(body, etag)
 
 
 @app.route("/api/pricing/categories/<int:category_id>", methods=["GET"])
 def get_category(category_id):
-    c = ScrapCategory.query.get_or_404(category_id)
-    return jsonify(
-        {
-            "id": c.id,
-            "name": c.name,
-            "base_price": c.base_price,
-            "unit": c.unit,
-            "description": c.description,
-            "image_url": c.image_url,
-        }
-    )
+    cached = category_catalog.snapshot().category_body(category_id)
+    if not cached:
+        return jsonify({"error": "Category not found"}), 404
+
+    return conditional_json(*cached)
+
+
+@app.route("/api/pricing/snapshot", methods=["GET"])
+def get_pricing_snapshot():
+    """Base prices, multipliers, regions and rules for services that quote
+    locally; poll with If-None-Match"""
+    return conditional_json(*pricing_snapshot.body())
 
 
 @app.route("/api/pricing/calculate", methods=["POST"])
@@ -138,40 +1412,120 @@ def calculate_price():
     quantity = data.get("quantity", 0)
     location = data.get("location", "default")
 
-    if not category_id or quantity <= 0:
+    if not is_integer(category_id) or not is_number(quantity) or quantity <= 0:
         return jsonify({"error": "Invalid category or quantity"}), 400
 
-    category = ScrapCategory.query.get(category_id)
+    category = category_catalog.snapshot().categories.get(category_id)
     if not category:
         return jsonify({"error": "Category not found"}), 404
 
-    dynamic = DynamicPricing.query.filter_by(
-        category_id=category_id, location=location
-    ).first()
-
-    multiplier = dynamic.multiplier if dynamic else 1.0
-
-    if quantity > 100:
-        multiplier *= 1.05
-
-    total = category.base_price * quantity * multiplier
+    try:
+        multiplier, total = compute_quote(
+            category_id,
+            category["base_price"],
+            quantity,
+            multiplier_table.lookup(category_id, location),
+        )
+    except QuoteError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify(
         {
-            "category": category.name,
+            "category": category["name"],
             "quantity": quantity,
-            "unit": category.unit,
-            "base_price": category.base_price,
+            "unit": category["unit"],
+            "base_price": category["base_price"],
             "multiplier": multiplier,
-            "total_price": round(total, 2),
+            "total_price": total,
             "location": location,
         }
     )
 
 
+@app.route("/api/pricing/calculate/batch", methods=["POST"])
+def calculate_price_batch():
+    """Price many (category, quantity, location) items at once from the catalog
+    snapshot and multiplier table; results keep input order"""
+    data = request.get_json() or {}
+    items = data.get("items")
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+
+    if len(items) > MAX_BATCH_QUOTES:
+        return jsonify({"error": f"At most {MAX_BATCH_QUOTES} items per request"}), 400
+
+    parsed = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        category_id = item.get("category_id")
+        quantity = item.get("quantity", 0)
+        location = item.get("location", "default")
+
+        if not is_integer(category_id) or not is_number(quantity) or quantity <= 0:
+            parsed.append(None)
+        else:
+            parsed.append((category_id, quantity, location))
+
+    categories = category_catalog.snapshot().categories
+    rules = pricing_rules.compiled()
+    results = [{"error": "Invalid category or quantity"}] * len(parsed)
+
+    by_category = {}
+    for i, entry in enumerate(parsed):
+        if entry is not None:
+            by_category.setdefault(entry[0], []).append(i)
+
+    # Price each category's items as arrays through the same rules as
+    # simulate_pending, looking up each distinct location once
+    for category_id, indexes in by_category.items():
+        category = categories.get(category_id)
+        if not category:
+            for i in indexes:
+                results[i] = {"error": "Category not found"}
+            continue
+
+        quantities = np.array([parsed[i][1] for i in indexes], dtype=np.float64)
+        keys, location_index = np.unique(
+            [normalize_location(parsed[i][2]) for i in indexes], return_inverse=True
+        )
+        location_multipliers = np.array(
+            [multiplier_table.lookup(category_id, k) for k in keys]
+        )
+
+        multipliers, totals, accepted = rules.apply_many(
+            category_id,
+            category["base_price"],
+            quantities,
+            location_multipliers[location_index],
+        )
+
+        rejected = {"error": f"Minimum quantity is {rules.minimum(category_id)}"}
+        for i, multiplier, total, ok in zip(
+            indexes, multipliers.tolist(), totals.tolist(), accepted.tolist()
+        ):
+            _, quantity, location = parsed[i]
+            results[i] = (
+                {
+                    "category_id": category_id,
+                    "category": category["name"],
+                    "quantity": quantity,
+                    "unit": category["unit"],
+                    "base_price": category["base_price"],
+                    "multiplier": multiplier,
+                    "total_price": total,
+                    "location": location,
+                }
+                if ok
+                else rejected
+            )
+
+    return jsonify({"results": results})
+
+
 @app.route("/api/pricing/categories", methods=["POST"])
 def create_category():
-    user = require_auth()
+    user = require_auth(check_active=True)
 
     if not user or user.get("role") != "admin":
         return jsonify({"error": "Unauthorized"}), 403
@@ -188,7 +1542,7 @@ def create_category():
 
     try:
         db.session.add(category)
-        db.session.commit()
+        db.session.flush()
 
         history = PriceHistory(
             category_id=category.id,
@@ -197,7 +1551,9 @@ def create_category():
             reason="Initial creation",
         )
         db.session.add(history)
+        bump_catalog_version()
         db.session.commit()
+        category_catalog.invalidate()
 
         return jsonify({"message": "Category created", "category_id": category.id}), 201
     except Exception as e:
@@ -207,7 +1563,7 @@ def create_category():
 
 @app.route("/api/pricing/categories/<int:category_id>/price", methods=["PUT"])
 def update_price(category_id):
-    user = require_auth()
+    user = require_auth(check_active=True)
 
     if not user or user.get("role") != "admin":
         return jsonify({"error": "Unauthorized"}), 403
@@ -215,7 +1571,7 @@ def update_price(category_id):
     data = request.get_json() or {}
     new_price = data.get("price")
 
-    if not new_price or new_price <= 0:
+    if not is_number(new_price) or new_price <= 0:
         return jsonify({"error": "Invalid price"}), 400
 
     category = ScrapCategory.query.get_or_404(category_id)
@@ -230,7 +1586,10 @@ def update_price(category_id):
             reason=data.get("reason", f"Updated from {old_price}"),
         )
         db.session.add(history)
+        bump_catalog_version()
         db.session.commit()
+        category_catalog.invalidate()
+        requote_in_background([category_id])
 
         return jsonify(
             {
@@ -244,14 +1603,421 @@ def update_price(category_id):
         return jsonify({"error": str(e)}), 500
 
 
+def parse_price_changes(data):
+    """Read {"prices": [...], "multipliers": [...]} into {category_id: price}
+    and {(category_id, normalized location): (location, multiplier)}, plus an
+    error body when the request is invalid"""
+    price_items = data.get("prices") or []
+    multiplier_items = data.get("multipliers") or []
+
+    if not isinstance(price_items, list) or not isinstance(multiplier_items, list):
+        return None, None, {"error": "prices and multipliers must be lists"}
+
+    if not price_items and not multiplier_items:
+        return None, None, {"error": "Nothing to update"}
+
+    if len(price_items) + len(multiplier_items) > MAX_BULK_UPDATES:
+        return None, None, {"error": f"At most {MAX_BULK_UPDATES} changes per request"}
+
+    # Later entries for the same key win
+    prices = {}
+    for item in price_items:
+        item = item if isinstance(item, dict) else {}
+        price = item.get("price")
+        if not is_number(price) or price <= 0:
+            return None, None, {"error": "Invalid price", "item": item}
+        prices[item.get("category_id")] = price
+
+    multipliers = {}
+    for item in multiplier_items:
+        item = item if isinstance(item, dict) else {}
+        multiplier = item.get("multiplier")
+        location = item.get("location")
+        if not is_number(multiplier) or multiplier <= 0:
+            return None, None, {"error": "Invalid multiplier", "item": item}
+        if not isinstance(location, str) or not location.strip():
+            return None, None, {"error": "Invalid location", "item": item}
+        key = (item.get("category_id"), normalize_location(location))
+        multipliers[key] = (" ".join(location.split()), multiplier)
+
+    return prices, multipliers, None
+
+
+@app.route("/api/pricing/prices", methods=["PUT"])
+def bulk_update_prices():
+    """Apply many base-price and location multiplier changes in one transaction:
+    {"prices": [{"category_id", "price"}], "multipliers": [{"category_id",
+    "location", "multiplier"}], "reason": "..."}"""
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    reason = data.get("reason", "Bulk price update")
+    prices, multipliers, error = parse_price_changes(data)
+    if error:
+        return jsonify(error), 400
+
+    category_ids = set(prices) | {category_id for category_id, _ in multipliers}
+    old_prices = dict(
+        db.session.query(ScrapCategory.id, ScrapCategory.base_price)
+        .filter(ScrapCategory.id.in_([i for i in category_ids if is_integer(i)]))
+        .all()
+    )
+    missing = sorted(
+        str(i) for i in category_ids if not is_integer(i) or i not in old_prices
+    )
+    if missing:
+        return jsonify({"error": "Category not found", "category_ids": missing}), 404
+
+    now = datetime.datetime.utcnow()
+    try:
+        if prices:
+            db.session.execute(
+                update(ScrapCategory)
+                .where(ScrapCategory.id.in_(prices))
+                .values(base_price=case(prices, value=ScrapCategory.id))
+                .execution_options(synchronize_session=False)
+            )
+            db.session.execute(
+                insert(PriceHistory),
+                [
+                    {
+                        "category_id": category_id,
+                        "price": price,
+                        "changed_at": now,
+                        "changed_by": user["id"],
+                        "reason": f"{reason} (from {old_prices[category_id]})",
+                    }
+                    for category_id, price in prices.items()
+                ],
+            )
+            bump_catalog_version()
+
+        if multipliers:
+            existing = {}
+            rows = (
+                db.session.query(
+                    DynamicPricing.id,
+                    DynamicPricing.category_id,
+                    DynamicPricing.location,
+                )
+                .filter(DynamicPricing.category_id.in_({c for c, _ in multipliers}))
+                .order_by(DynamicPricing.id)
+                .all()
+            )
+            for row in rows:
+                key = (row.category_id, normalize_location(row.location))
+                if key in multipliers:
+                    existing.setdefault(key, []).append(row.id)
+
+            updates = {
+                row_id: multipliers[key][1]
+                for key, row_ids in existing.items()
+                for row_id in row_ids
+            }
+            if updates:
+                db.session.execute(
+                    update(DynamicPricing)
+                    .where(DynamicPricing.id.in_(updates))
+                    .values(
+                        multiplier=case(updates, value=DynamicPricing.id),
+                        updated_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+
+            inserts = [
+                {
+                    "category_id": category_id,
+                    "location": location,
+                    "multiplier": multiplier,
+                    "updated_at": now,
+                }
+                for (category_id, key), (location, multiplier) in multipliers.items()
+                if (category_id, key) not in existing
+            ]
+            if inserts:
+                db.session.execute(insert(DynamicPricing), inserts)
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    category_catalog.invalidate()
+    multiplier_table.invalidate()
+    requote_in_background(category_ids)
+
+    return jsonify(
+        {
+            "message": "Prices updated",
+            "prices_updated": len(prices),
+            "multipliers_updated": len(multipliers),
+        }
+    )
+
+
+@app.route("/api/pricing/simulate", methods=["POST"])
+def simulate_prices():
+    """What-if for a bulk price update: takes the same body as PUT
+    /api/pricing/prices and re-prices the pending book without writing.
+    Streams NDJSON: a "city" line per (category, city), a "category" line
+    after each category, then a "summary" line"""
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    prices, multipliers, error = parse_price_changes(request.get_json() or {})
+    if error:
+        return jsonify(error), 400
+
+    categories = category_catalog.snapshot().categories
+    category_ids = set(prices) | {category_id for category_id, _ in multipliers}
+    missing = sorted(str(i) for i in category_ids if i not in categories)
+    if missing:
+        return jsonify({"error": "Category not found", "category_ids": missing}), 404
+
+    overrides = {key: multiplier for key, (_, multiplier) in multipliers.items()}
+
+    def line(kind, fields, counts):
+        requests_count, rejected, current, simulated = counts
+        return (
+            app.json.dumps(
+                {
+                    "type": kind,
+                    **fields,
+                    "requests": int(requests_count),
+                    "rejected": int(rejected),
+                    "current_total": round(float(current), 2),
+                    "simulated_total": round(float(simulated), 2),
+                    "delta": round(float(simulated - current), 2),
+                }
+            )
+            + "\n"
+        )
+
+    def generate():
+        overall = [0, 0, 0.0, 0.0]
+        try:
+            for category_id, base_price, cities in simulate_pending(prices, overrides):
+                category_totals = [0, 0, 0.0, 0.0]
+                for city, counts in sorted(cities.items()):
+                    yield line(
+                        "city", {"category_id": category_id, "city": city}, counts
+                    )
+                    for i, value in enumerate(counts):
+                        category_totals[i] += value
+
+                yield line(
+                    "category",
+                    {"category_id": category_id, "base_price": base_price},
+                    category_totals,
+                )
+                for i, value in enumerate(category_totals):
+                    overall[i] += value
+        except Exception as e:
+            yield app.json.dumps({"type": "error", "error": str(e)}) + "\n"
+            return
+
+        yield line("summary", {}, overall)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/api/pricing/requote", methods=["POST"])
+def requote():
+    """Re-price pending requests for {"category_ids": [...]} and wait for it"""
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    category_ids = (request.get_json() or {}).get("category_ids")
+    if not isinstance(category_ids, list) or not all(
+        is_integer(i) for i in category_ids
+    ):
+        return jsonify({"error": "category_ids must be a list of integers"}), 400
+
+    try:
+        updated = requote_pending(category_ids)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"message": "Pending requests re-quoted", "updated": updated})
+
+
+@app.route("/api/pricing/rules", methods=["GET"])
+def get_rules():
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    rules = PricingRule.query.order_by(PricingRule.id).all()
+    return jsonify({"rules": [serialize_rule(r) for r in rules]})
+
+
+@app.route("/api/pricing/rules", methods=["POST"])
+def create_rule():
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    rule = PricingRule(created_by=user["id"])
+
+    error = apply_rule_fields(rule, data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        db.session.add(rule)
+        bump_rules_version()
+        db.session.commit()
+        pricing_rules.invalidate()
+
+        return jsonify({"message": "Rule created", "rule": serialize_rule(rule)}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/pricing/rules/<int:rule_id>", methods=["PUT"])
+def update_rule(rule_id):
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    rule = PricingRule.query.get_or_404(rule_id)
+
+    error = apply_rule_fields(rule, request.get_json() or {})
+    if error:
+        db.session.rollback()
+        return jsonify({"error": error}), 400
+
+    try:
+        bump_rules_version()
+        db.session.commit()
+        pricing_rules.invalidate()
+
+        return jsonify({"message": "Rule updated", "rule": serialize_rule(rule)})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/pricing/rules/<int:rule_id>", methods=["DELETE"])
+def delete_rule(rule_id):
+    """Deactivate rather than delete, so rule history is kept"""
+    user = require_auth(check_active=True)
+
+    if not user or user.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    rule = PricingRule.query.get_or_404(rule_id)
+    rule.is_active = False
+
+    try:
+        bump_rules_version()
+        db.session.commit()
+        pricing_rules.invalidate()
+
+        return jsonify({"message": "Rule deactivated"})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/pricing/forecast", methods=["GET"])
+def get_forecast():
+    """Expected base price ?horizon_days= ahead (default 7) for every category,
+    or ?category_id=; with ?location= scaled by that location's multiplier.
+    advice is "wait" when the price is expected to rise, else "sell_now"."""
+    horizon = request.args.get("horizon_days", 7, type=float)
+    if horizon <= 0 or horizon > FORECAST_MAX_HORIZON_DAYS:
+        return (
+            jsonify(
+                {"error": f"horizon_days must be in (0, {FORECAST_MAX_HORIZON_DAYS}]"}
+            ),
+            400,
+        )
+
+    category_id = request.args.get("category_id", type=int)
+    forecasts = price_forecaster.forecast(
+        horizon, [category_id] if category_id else None
+    )
+
+    location = request.args.get("location")
+    for f in forecasts:
+        f["advice"] = "wait" if f["trend"] == "rising" else "sell_now"
+        if location:
+            multiplier = multiplier_table.lookup(f["category_id"], location)
+            f["location"] = location
+            f["multiplier"] = multiplier
+            f["forecast_location_price"] = round(f["forecast_price"] * multiplier, 2)
+
+    return jsonify({"horizon_days": horizon, "forecasts": forecasts})
+
+
 @app.route("/api/pricing/history/<int:category_id>", methods=["GET"])
 def get_history(category_id):
+    """Price changes newest first, optionally within ?from=&to= (ISO 8601).
+    Pages are keyset-based: pass next_cursor back as ?cursor=. With
+    ?bucket=day|week|month returns OHLC buckets aggregated in SQL instead"""
+    try:
+        start = request.args.get("from")
+        end = request.args.get("to")
+        start = datetime.datetime.fromisoformat(start) if start else None
+        end = datetime.datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({"error": "from and to must be ISO 8601 datetimes"}), 400
+
+    bucket = request.args.get("bucket")
+    if bucket:
+        if bucket not in HISTORY_BUCKETS:
+            return jsonify({"error": "bucket must be day, week or month"}), 400
+        buckets = history_buckets(category_id, bucket, start, end)
+        return jsonify({"bucket": bucket, "buckets": buckets})
+
+    limit = max(1, min(request.args.get("limit", 20, type=int), MAX_HISTORY_PAGE))
+
+    query = PriceHistory.query.filter(PriceHistory.category_id == category_id)
+    if start:
+        query = query.filter(PriceHistory.changed_at >= start)
+    if end:
+        query = query.filter(PriceHistory.changed_at < end)
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            changed_at, history_id = cursor.rsplit("_", 1)
+            changed_at = datetime.datetime.fromisoformat(changed_at)
+            history_id = int(history_id)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        query = query.filter(
+            or_(
+                PriceHistory.changed_at < changed_at,
+                and_(
+                    PriceHistory.changed_at == changed_at,
+                    PriceHistory.id < history_id,
+                ),
+            )
+        )
+
     history = (
-        PriceHistory.query.filter_by(category_id=category_id)
-        .order_by(PriceHistory.changed_at.desc())
-        .limit(20)
+        query.order_by(PriceHistory.changed_at.desc(), PriceHistory.id.desc())
+        .limit(limit + 1)
         .all()
     )
+    has_more = len(history) > limit
+    history = history[:limit]
 
     return jsonify(
         {
@@ -262,11 +2028,81 @@ def get_history(category_id):
                     "reason": h.reason,
                 }
                 for h in history
-            ]
+            ],
+            "next_cursor": (
+                f"{history[-1].changed_at.isoformat()}_{history[-1].id}"
+                if has_more
+                else None
+            ),
         }
     )
 
 
+def history_buckets(category_id, bucket, start, end):
+    """Open/high/low/close and change count per bucket, oldest first"""
+    mysql_format, sqlite_format = HISTORY_BUCKETS[bucket]
+    if db.engine.dialect.name == "mysql":
+        bucket_key = func.date_format(PriceHistory.changed_at, mysql_format)
+    else:
+        bucket_key = func.strftime(sqlite_format, PriceHistory.changed_at)
+
+    bucket_key = bucket_key.label("bucket")
+    ranked = select(
+        bucket_key,
+        PriceHistory.price,
+        PriceHistory.changed_at,
+        func.row_number()
+        .over(
+            partition_by=bucket_key,
+            order_by=(PriceHistory.changed_at, PriceHistory.id),
+        )
+        .label("first_rank"),
+        func.row_number()
+        .over(
+            partition_by=bucket_key,
+            order_by=(PriceHistory.changed_at.desc(), PriceHistory.id.desc()),
+        )
+        .label("last_rank"),
+    ).where(PriceHistory.category_id == category_id)
+
+    if start:
+        ranked = ranked.where(PriceHistory.changed_at >= start)
+    if end:
+        ranked = ranked.where(PriceHistory.changed_at < end)
+
+    ranked = ranked.subquery()
+    rows = db.session.execute(
+        select(
+            ranked.c.bucket,
+            func.min(ranked.c.changed_at).label("starts_at"),
+            func.max(case((ranked.c.first_rank == 1, ranked.c.price))).label("open"),
+            func.max(ranked.c.price).label("high"),
+            func.min(ranked.c.price).label("low"),
+            func.max(case((ranked.c.last_rank == 1, ranked.c.price))).label("close"),
+            func.count().label("changes"),
+        )
+        .group_by(ranked.c.bucket)
+        .order_by(ranked.c.bucket)
+    ).all()
+
+    return [
+        {
+            "bucket": r.bucket,
+            "starts_at": (
+                r.starts_at.isoformat()
+                if isinstance(r.starts_at, datetime.datetime)
+                else r.starts_at
+            ),
+            "open": r.open,
+            "high": r.high,
+            "low": r.low,
+            "close": r.close,
+            "changes": r.changes,
+        }
+        for r in rows
+    ]
+
+
 # ---------------- INIT DATA ----------------
 def init_sample_data():
     if ScrapCategory.query.count() == 0:
@@ -305,9 +2141,35 @@ def init_sample_data():
         db.session.add_all(samples)
         db.session.commit()
 
+    if not CatalogVersion.query.get(1):
+        db.session.add(CatalogVersion(id=1, version=1))
+        db.session.commit()
+
+    if not RulesVersion.query.get(1):
+        db.session.add(RulesVersion(id=1, version=1))
+        db.session.commit()
+
+
+def add_missing_columns():
+    """db.create_all() never alters existing tables; add columns introduced
+    since, all nullable"""
+    added = {"dynamic_pricing": {"demand_factor": "FLOAT"}}
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table, columns in added.items():
+            existing = {c["name"] for c in inspector.get_columns(table)}
+            for column, column_type in columns.items():
+                if column not in existing:
+                    conn.execute(
+                        text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                    )
+
 
 with app.app_context():
     db.create_all()
+    add_missing_columns()
     init_sample_data()
 
+demand_engine.start()
+
 
@@ -0,0 +1 @@
+"""Code shared by the Flask services; copied into each image under /app/shared"""
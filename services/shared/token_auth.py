@@ -0,0 +1,282 @@
+"""JWT verification shared by pricing-, user- and dealer-service.
+
+Tokens are checked locally (HS256 with SECRET_KEY, or RS256/EdDSA against
+auth-service's JWKS), revocations are tailed from auth-service, and verified
+users are cached per token. auth-service is only called when a token can't be
+decided locally or the caller needs a live is_active check.
+"""
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+import requests
+
+# ---- CONFIG
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "60"))
+JWKS_MIN_REFRESH = float(os.getenv("JWKS_MIN_REFRESH", "30"))
+REVOCATION_REFRESH = float(os.getenv("REVOCATION_REFRESH", "5"))
+
+
+# ---- CACHES
+class TokenCache:
+    """Thread-safe LRU of verified users keyed by token digest. Entries expire
+    at the earlier of the token's exp and the configured TTL"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, key, user, exp=None):
+        expires_at = time.time() + self.ttl
+        if exp:
+            expires_at = min(expires_at, exp)
+
+        with self._lock:
+            self._entries[key] = (expires_at, dict(user))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class JwksCache:
+    """Public keys from auth-service's JWKS endpoint, keyed by kid. Refetched
+    once Cache-Control max-age lapses, or on an unknown kid at most once per
+    min_refresh seconds; one thread fetches while the others wait and reuse it"""
+
+    def __init__(self, url, min_refresh):
+        self.url = url
+        self.min_refresh = min_refresh
+        self._keys = {}
+        self._expires_at = 0
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+
+    def get(self, kid):
+        key = self._keys.get(kid)
+        if key is not None and time.time() < self._expires_at:
+            return key
+
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None and time.time() < self._expires_at:
+                return key
+
+            if time.time() - self._fetched_at >= self.min_refresh:
+                self._refresh()
+
+            # A failed refresh keeps serving the last known keys
+            return self._keys.get(kid)
+
+    def _refresh(self):
+        self._fetched_at = time.time()
+        try:
+            res = requests.get(self.url, timeout=5)
+            res.raise_for_status()
+
+            keys = {}
+            for jwk in res.json().get("keys", []):
+                if jwk.get("alg") not in ("RS256", "EdDSA"):
+                    continue
+                keys[jwk.get("kid")] = (jwt.PyJWK(jwk).key, jwk["alg"])
+
+            max_age = re.search(r"max-age=(\d+)", res.headers.get("Cache-Control", ""))
+            ttl = int(max_age.group(1)) if max_age else 300
+
+            self._keys = keys
+            # Jitter so workers that started together don't refetch together
+            self._expires_at = self._fetched_at + ttl * random.uniform(0.8, 1.0)
+        except Exception as e:
+            print(f"JWKS refresh error: {e}")
+
+
+class RevocationList:
+    """Digests of revoked, unexpired tokens, tailed incrementally from
+    auth-service every `interval` seconds so checks stay in memory"""
+
+    def __init__(self, url, interval):
+        self.url = url
+        self.interval = interval
+        self._revoked = {}
+        self._last_id = 0
+        self._next_refresh = 0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, digest):
+        if time.time() >= self._next_refresh:
+            self.refresh()
+        return digest in self._revoked
+
+    def refresh(self):
+        # Only one thread refreshes; the rest keep using the current set
+        if not self._lock.acquire(blocking=False):
+            return
+
+        try:
+            now = time.time()
+            revoked = {d: e for d, e in self._revoked.items() if e > now}
+            last_id = self._last_id
+
+            while True:
+                res = requests.get(self.url, params={"after": last_id}, timeout=5)
+                res.raise_for_status()
+                data = res.json()
+
+                for r in data.get("revocations", []):
+                    revoked[r["token_digest"]] = r["expires_at"]
+                last_id = data.get("last_id", last_id)
+
+                if not data.get("has_more"):
+                    break
+
+            self._revoked = revoked
+            self._last_id = last_id
+        except Exception as e:
+            print(f"Revocation refresh error: {e}")
+        finally:
+            # On failure keep the last known set and retry next interval
+            self._next_refresh = time.time() + self.interval
+            self._lock.release()
+
+    def stats(self):
+        return {"size": len(self._revoked), "last_id": self._last_id}
+
+
+# ---- VERIFICATION
+def token_digest(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expiry(token):
+    try:
+        return jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.InvalidTokenError:
+        return None
+
+
+class TokenVerifier:
+    """Resolves JWTs to the same user dict auth-service's /api/auth/verify
+    returns, checking them locally wherever possible"""
+
+    def __init__(self, auth_url, secret_key):
+        self.auth_url = auth_url
+        self.secret_key = secret_key
+        self.token_cache = TokenCache(max_size=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+        self.jwks_cache = JwksCache(
+            url=f"{auth_url}/.well-known/jwks.json", min_refresh=JWKS_MIN_REFRESH
+        )
+        self.revocation_list = RevocationList(
+            url=f"{auth_url}/api/auth/revocations", interval=REVOCATION_REFRESH
+        )
+
+    def verify(self, token, check_active=False):
+        """Resolve a JWT to its user, serving repeat tokens from token_cache"""
+        digest = token_digest(token)
+        if self.revocation_list.is_revoked(digest):
+            return None
+
+        cache_key = (digest, check_active)
+        user = self.token_cache.get(cache_key)
+        if user:
+            return user
+
+        user = self.resolve(token, check_active)
+        if user:
+            self.token_cache.put(cache_key, user, token_expiry(token))
+
+        return user
+
+    def resolve(self, token, check_active=False):
+        """Validate a JWT locally; only ask auth-service when we can't decide
+        here (HS256 token without a secret) or the caller needs a live
+        is_active check"""
+        try:
+            kid = jwt.get_unverified_header(token).get("kid")
+        except jwt.InvalidTokenError:
+            return None
+
+        if not kid and not self.secret_key:
+            return self.fetch_user(token)
+
+        data = self.decode(token, kid)
+        if not data:
+            return None
+
+        if check_active:
+            return self.fetch_user(token)
+
+        return {
+            "id": data["user_id"],
+            "email": data.get("email"),
+            "full_name": data.get("full_name"),
+            "role": data.get("role"),
+        }
+
+    def decode(self, token, kid=None):
+        """Check the JWT signature and expiry locally, against the JWKS key
+        named by kid or the shared secret for HS256 tokens"""
+        try:
+            if kid:
+                key = self.jwks_cache.get(kid)
+                if key is None:
+                    return None
+                data = jwt.decode(token, key[0], algorithms=[key[1]])
+            else:
+                data = jwt.decode(token, self.secret_key, algorithms=["HS256"])
+        except jwt.InvalidTokenError:
+            return None
+
+        if not data.get("user_id"):
+            return None
+
+        return data
+
+    def fetch_user(self, token):
+        """Ask auth-service to validate the JWT and load the live user record"""
+        try:
+            res = requests.get(
+                f"{self.auth_url}/api/auth/verify",
+                headers={"Authorization": f"Bearer {token}"},
+                timeout=5,
+            )
+            if res.status_code == 200:
+                return res.json().get("user")
+        except Exception as e:
+            print(f"Token verification error: {e}")
+        return None
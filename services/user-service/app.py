@@ -1,9 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
 import datetime
+import hashlib
+import heapq
+import math
+import random
+import secrets
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+import numpy as np
 import requests
+from shared.token_auth import TokenVerifier, token_digest, token_expiry
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.exc import IntegrityError
 
 app = Flask(__name__)
 CORS(app)
@@ -24,6 +37,57 @@ if not AUTH_SERVICE_URL:
 if not PRICING_SERVICE_URL:
     raise RuntimeError("PRICING_SERVICE_URL environment variable is required")
 
+# Used to verify JWTs locally; without it every request falls back to auth-service
+SECRET_KEY = os.getenv("SECRET_KEY")
+
+# Quotes come from a local copy of pricing-service's snapshot, refetched every
+# PRICING_SNAPSHOT_INTERVAL seconds; past PRICING_SNAPSHOT_MAX_AGE without a
+# successful fetch, requests are stored without an estimate
+PRICING_SNAPSHOT_INTERVAL = float(os.getenv("PRICING_SNAPSHOT_INTERVAL", "10"))
+PRICING_SNAPSHOT_MAX_AGE = float(os.getenv("PRICING_SNAPSHOT_MAX_AGE", "300"))
+
+# /api/users/requests/all pages; ?format=ndjson streams instead, fetching
+# STREAM_BATCH_SIZE rows at a time from a server-side cursor
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+
+# request_events outbox: /api/users/events pages, and maintenance every
+# EVENT_COMPACT_INTERVAL seconds (0 disables) that keeps only each request's
+# latest event past EVENT_COMPACT_AFTER_HOURS and drops all past retention
+EVENT_PAGE_SIZE = int(os.getenv("EVENT_PAGE_SIZE", "500"))
+# Feeds stop at a gap in event ids, since a lower id may belong to a
+# transaction that hasn't committed yet. A gap is treated as rolled back once
+# the event after it is EVENT_GAP_TIMEOUT seconds old, so keep this above the
+# longest transaction that writes events
+EVENT_GAP_TIMEOUT = float(os.getenv("EVENT_GAP_TIMEOUT", "30"))
+EVENT_COMPACT_INTERVAL = float(os.getenv("EVENT_COMPACT_INTERVAL", "600"))
+EVENT_COMPACT_AFTER_HOURS = float(os.getenv("EVENT_COMPACT_AFTER_HOURS", "24"))
+EVENT_RETENTION_HOURS = float(os.getenv("EVENT_RETENTION_HOURS", "168"))
+EVENT_MAINTENANCE_BATCH = 1000
+
+# /api/users/events/stream: each worker tails the outbox every
+# SSE_POLL_INTERVAL seconds into a buffer of the last SSE_BUFFER_SIZE events
+# shared by its subscribers; idle streams get a heartbeat every
+# SSE_HEARTBEAT_INTERVAL seconds and are closed after SSE_MAX_DURATION
+SSE_POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "1"))
+SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "1000"))
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_MAX_DURATION = float(os.getenv("SSE_MAX_DURATION", "3600"))
+# EventSource cannot send headers, so browsers open streams with a ticket from
+# POST /api/users/events/ticket, redeemable once within SSE_TICKET_TTL seconds
+SSE_TICKET_TTL = float(os.getenv("SSE_TICKET_TTL", "30"))
+
+# Pending pickups are indexed by geohash; nearby searches read the cells
+# around the dealer from NEARBY_START_PRECISION (~150 m) outward, one coarser
+# level at a time, until the nearest `limit` are closer than anything unread
+PICKUP_GEOHASH_PRECISION = 9
+NEARBY_START_PRECISION = 7
+DEFAULT_NEARBY_RADIUS_KM = 10.0
+MAX_NEARBY_RADIUS_KM = float(os.getenv("MAX_NEARBY_RADIUS_KM", "50"))
+DEFAULT_NEARBY_LIMIT = 20
+MAX_NEARBY_LIMIT = 100
+
 db = SQLAlchemy(app)
 
 
@@ -45,6 +109,16 @@ class UserProfile(db.Model):
 
 class ScrapRequest(db.Model):
     __tablename__ = "scrap_requests"
+    # Lets pricing-service re-quote one category's pending requests in id order
+    __table_args__ = (
+        db.Index(
+            "ix_scrap_requests_category_status_id", "category_id", "status", "id"
+        ),
+        # Keyset pages of /api/users/requests/all, newest first
+        db.Index(
+            "ix_scrap_requests_status_created_id", "status", "created_at", "id"
+        ),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, nullable=False, index=True)
@@ -71,22 +145,80 @@ class RequestHistory(db.Model):
     changed_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
 
 
+class UserStats(db.Model):
+    """Dashboard counters per user, kept in step with scrap_requests in the
+    same transaction; `flask rebuild-user-stats` recomputes them"""
+
+    __tablename__ = "user_stats"
+
+    user_id = db.Column(db.Integer, primary_key=True)
+    total_requests = db.Column(db.Integer, nullable=False, default=0)
+    pending_requests = db.Column(db.Integer, nullable=False, default=0)
+    accepted_requests = db.Column(db.Integer, nullable=False, default=0)
+    completed_requests = db.Column(db.Integer, nullable=False, default=0)
+    cancelled_requests = db.Column(db.Integer, nullable=False, default=0)
+    total_earnings = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+
+class RequestEvent(db.Model):
+    """Outbox of scrap request changes, written in the same transaction as
+    the change and tailed through /api/users/events"""
+
+    __tablename__ = "request_events"
+    # Compaction looks up each request's latest event; SSE resumes scan by user
+    __table_args__ = (
+        db.Index("ix_request_events_request_id_id", "request_id", "id"),
+        db.Index("ix_request_events_user_id_id", "user_id", "id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    request_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    category_id = db.Column(db.Integer)
+    event_type = db.Column(db.String(20), nullable=False)
+    old_status = db.Column(db.String(20))
+    status = db.Column(db.String(20))
+    estimated_price = db.Column(db.Float)
+    assigned_dealer_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, index=True)
+
+
+class PendingPickup(db.Model):
+    """Location of each pending request, from its owner's profile, keyed by
+    geohash so nearby searches are prefix range scans"""
+
+    __tablename__ = "pending_pickups"
+
+    request_id = db.Column(
+        db.Integer, db.ForeignKey("scrap_requests.id"), primary_key=True
+    )
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    geohash = db.Column(db.String(12), nullable=False, index=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+
+
+class StreamTicket(db.Model):
+    """Single-use ticket that opens one event stream for the token it was
+    issued against; only the digest of the ticket is stored"""
+
+    __tablename__ = "stream_tickets"
+
+    id = db.Column(db.Integer, primary_key=True)
+    ticket_digest = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    role = db.Column(db.String(20))
+    token_digest = db.Column(db.String(64), nullable=False)
+    token_expires_at = db.Column(db.Float)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+
 # --- HELPERS
-def verify_token(token):
-    try:
-        res = requests.get(
-            f"{AUTH_SERVICE_URL}/api/auth/verify",
-            headers={"Authorization": f"Bearer {token}"},
-            timeout=5,
-        )
-        if res.status_code == 200:
-            return res.json().get("user")
-    except Exception as e:
-        print(f"Token verification error: {e}")
-    return None
+token_verifier = TokenVerifier(auth_url=AUTH_SERVICE_URL, secret_key=SECRET_KEY)
 
 
-def get_current_user():
+def get_current_user(check_active=False):
     token = request.headers.get("Authorization")
     if not token:
         return None
@@ -94,32 +226,727 @@ def get_current_user():
     if token.startswith("Bearer "):
         token = token[7:]
 
-    return verify_token(token)
+    return token_verifier.verify(token, check_active)
+
+
+# ---- PRICING SNAPSHOT
+def normalize_location(location):
+    """Same folding as pricing-service: "Pune", " pune " and "PUNE" share a key"""
+    if not isinstance(location, str):
+        return "default"
+    return " ".join(location.split()).casefold() or "default"
+
+
+class PricingSnapshot:
+    """Local copy of pricing-service's /api/pricing/snapshot, refetched in the
+    background with If-None-Match so quoting never waits on pricing-service.
+    quote() mirrors pricing-service's compute_quote"""
+
+    def __init__(self, url, interval, max_age):
+        self.url = url
+        self.interval = interval
+        self.max_age = max_age
+        self._tables = None
+        self._etag = None
+        self._fetched_at = 0
+        self.failures = 0
+
+    def start(self):
+        self.refresh()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval * random.uniform(0.9, 1.1))
+            self.refresh()
+
+    def refresh(self):
+        try:
+            headers = {"If-None-Match": f'"{self._etag}"'} if self._etag else {}
+            res = requests.get(self.url, headers=headers, timeout=5)
+            if res.status_code != 304:
+                res.raise_for_status()
+                self._tables = self._build(res.json())
+                self._etag = res.headers.get("ETag", "").strip('"') or None
+            self._fetched_at = time.time()
+        except Exception as e:
+            # Keep quoting from the last snapshot until it exceeds max_age
+            self.failures += 1
+            print(f"Pricing snapshot refresh error: {e}")
+
+    def _build(self, data):
+        def keyed(entries, fields):
+            return {e["category_id"]: tuple(e[f] for f in fields) for e in entries}
+
+        rules = data.get("rules", {})
+        default_tiers = rules.get("default_tiers", {})
+        return {
+            "version": data.get("version"),
+            "prices": {c["id"]: c["base_price"] for c in data.get("categories", [])},
+            "multipliers": {
+                (m["category_id"], m["location"]): m["multiplier"]
+                for m in data.get("multipliers", [])
+            },
+            "regions": data.get("regions", {}),
+            "tiers": keyed(rules.get("tiers", []), ("thresholds", "values")),
+            "promotions": keyed(rules.get("promotions", []), ("thresholds", "values")),
+            "min_quantity": {
+                e["category_id"]: e["value"] for e in rules.get("min_quantity", [])
+            },
+            "caps": {e["category_id"]: e["value"] for e in rules.get("caps", [])},
+            "default_tiers": (
+                default_tiers.get("thresholds", []),
+                default_tiers.get("values", []),
+            ),
+        }
+
+    def quote(self, category_id, quantity, location):
+        """Estimated total price, or None when the category is unknown, a rule
+        rejects the quantity or the snapshot is missing or too old"""
+        tables = self._tables
+        if tables is None or time.time() - self._fetched_at > self.max_age:
+            return None
+
+        base_price = tables["prices"].get(category_id)
+        if base_price is None:
+            return None
+        if not isinstance(quantity, (int, float)) or quantity <= 0:
+            return None
+
+        multiplier = 1.0
+        city = normalize_location(location)
+        for key in (city, tables["regions"].get(city), "default"):
+            entry = tables["multipliers"].get((category_id, key)) if key else None
+            if entry:
+                multiplier = entry
+                break
+
+        min_quantity = tables["min_quantity"]
+        min_quantity = min_quantity.get(category_id, min_quantity.get(None))
+        if min_quantity and quantity < min_quantity:
+            return None
+
+        tiers = tables["tiers"]
+        thresholds, bonuses = (
+            tiers.get(category_id) or tiers.get(None) or tables["default_tiers"]
+        )
+        i = bisect_left(thresholds, quantity)
+        if i:
+            multiplier *= bonuses[i - 1]
+
+        promotions = tables["promotions"]
+        promotions = promotions.get(category_id, promotions.get(None))
+        if promotions:
+            i = bisect_left(promotions[0], quantity)
+            if i:
+                multiplier *= promotions[1][i - 1]
+
+        total = base_price * quantity * multiplier
+        caps = tables["caps"]
+        cap = caps.get(category_id, caps.get(None))
+        if cap is not None and total > cap:
+            total = cap
+
+        # Same rounding as pricing-service's CompiledRules, so cents agree
+        return float(np.round(total, 2))
+
+    def stats(self):
+        tables = self._tables
+        return {
+            "version": tables["version"] if tables else None,
+            "age": round(time.time() - self._fetched_at, 1) if tables else None,
+            "categories": len(tables["prices"]) if tables else 0,
+            "failures": self.failures,
+        }
 
 
-def calculate_price(category_id, quantity, location):
+pricing_snapshot = PricingSnapshot(
+    url=f"{PRICING_SERVICE_URL}/api/pricing/snapshot",
+    interval=PRICING_SNAPSHOT_INTERVAL,
+    max_age=PRICING_SNAPSHOT_MAX_AGE,
+)
+
+
+# ---- USER STATS
+STATUS_COUNTERS = {
+    "pending": "pending_requests",
+    "accepted": "accepted_requests",
+    "completed": "completed_requests",
+    "cancelled": "cancelled_requests",
+}
+
+
+def aggregate_user_stats(user_id=None):
+    """Recompute user_stats rows from scrap_requests with one GROUP BY"""
+    columns = [
+        func.sum(case((ScrapRequest.status == status, 1), else_=0)).label(column)
+        for status, column in STATUS_COUNTERS.items()
+    ]
+    query = select(
+        ScrapRequest.user_id,
+        func.count().label("total_requests"),
+        *columns,
+        func.sum(
+            case(
+                (ScrapRequest.status == "completed", ScrapRequest.estimated_price),
+                else_=0,
+            )
+        ).label("total_earnings"),
+    ).group_by(ScrapRequest.user_id)
+
+    if user_id is not None:
+        query = query.where(ScrapRequest.user_id == user_id)
+
+    stats = []
+    for row in db.session.execute(query):
+        entry = {column: int(value or 0) for column, value in row._mapping.items()}
+        entry["total_earnings"] = float(row.total_earnings or 0)
+        stats.append(entry)
+    return stats
+
+
+def backfill_user_stats(user_id):
+    """Create a missing user_stats row from scrap_requests, including the
+    caller's flushed changes. Returns False if another transaction won"""
+    rows = aggregate_user_stats(user_id) or [{"user_id": user_id}]
     try:
-        res = requests.post(
-            f"{PRICING_SERVICE_URL}/api/pricing/calculate",
-            json={
-                "category_id": category_id,
-                "quantity": quantity,
-                "location": location,
-            },
-            timeout=5,
+        with db.session.begin_nested():
+            db.session.add(UserStats(**rows[0]))
+        return True
+    except IntegrityError:
+        return False
+
+
+def record_status_change(user_id, old_status, new_status, price):
+    """Adjust a user's counters for one request moving old_status -> new_status
+    (old_status None for a new request), in the caller's transaction"""
+    deltas = {}
+    if old_status is None:
+        deltas["total_requests"] = 1
+    elif old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        column = STATUS_COUNTERS[new_status]
+        deltas[column] = deltas.get(column, 0) + 1
+
+    completed = (new_status == "completed") - (old_status == "completed")
+    earnings = (price or 0) * completed
+    if earnings:
+        deltas["total_earnings"] = earnings
+
+    values = {
+        getattr(UserStats, column): getattr(UserStats, column) + delta
+        for column, delta in deltas.items()
+        if delta
+    }
+    if not values:
+        return
+
+    updated = UserStats.query.filter_by(user_id=user_id).update(
+        values, synchronize_session=False
+    )
+    if updated:
+        return
+
+    # No row yet: build it from scrap_requests, which already holds this change
+    db.session.flush()
+    if not backfill_user_stats(user_id):
+        UserStats.query.filter_by(user_id=user_id).update(
+            values, synchronize_session=False
         )
-        if res.status_code == 200:
-            return res.json().get("total_price")
-    except Exception as e:
-        print(f"Price calculation error: {e}")
 
-    return None
+
+# ---- PICKUP INDEX
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = 111.32
+
+
+def geohash_encode(latitude, longitude, precision):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+
+    while len(chars) < precision:
+        # Bits alternate longitude, latitude, starting with longitude
+        span, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        if coordinate >= middle:
+            value = value * 2 + 1
+            span[0] = middle
+        else:
+            value *= 2
+            span[1] = middle
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits, value = 0, 0
+
+    return "".join(chars)
+
+
+def geohash_cell_size(precision):
+    """(height, width) of a geohash cell in degrees"""
+    lat_bits = 5 * precision // 2
+    lon_bits = 5 * precision - lat_bits
+    return 180.0 / 2**lat_bits, 360.0 / 2**lon_bits
+
+
+def geohash_prefix(cell):
+    """Rows under a geohash cell. A LIKE prefix is an index range scan on
+    MySQL under any collation, where a hand-built upper bound would depend on
+    how the collation orders it; geohashes never contain % or _"""
+    return PendingPickup.geohash.like(cell + "%")
+
+
+def geohash_block(latitude, longitude, precision):
+    """The cell containing the point and its eight neighbours, with the
+    distance in km every point of the block is at least that close to"""
+    height, width = geohash_cell_size(precision)
+    cells = set()
+    for i in (-1, 0, 1):
+        for j in (-1, 0, 1):
+            lat = min(max(latitude + i * height, -90.0), 90.0)
+            lon = (longitude + j * width + 180.0) % 360.0 - 180.0
+            cells.add(geohash_encode(lat, lon, precision))
+
+    cos_lat = math.cos(math.radians(latitude))
+    return cells, min(height, width * cos_lat) * KM_PER_DEGREE
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def index_pickup(scrap_request, profile):
+    """Add a pending request to the pickup index in the caller's transaction,
+    if its owner's profile has coordinates"""
+    if not profile or profile.latitude is None or profile.longitude is None:
+        return
+    db.session.merge(
+        PendingPickup(
+            request_id=scrap_request.id,
+            user_id=scrap_request.user_id,
+            geohash=geohash_encode(
+                profile.latitude, profile.longitude, PICKUP_GEOHASH_PRECISION
+            ),
+            latitude=profile.latitude,
+            longitude=profile.longitude,
+        )
+    )
+
+
+def unindex_pickup(request_id):
+    PendingPickup.query.filter_by(request_id=request_id).delete(
+        synchronize_session=False
+    )
+
+
+def find_nearby_pickups(latitude, longitude, radius_km, limit):
+    """Up to `limit` (distance_km, request row) pairs within radius_km,
+    nearest first. Reads the 3x3 cell block around the point at ever coarser
+    precision, only id and coordinates and only inside the radius' bounding
+    box, until the `limit` nearest so far are all inside what the block is
+    known to cover. Full rows are loaded for the winners only"""
+    # Bounding box of the circle; longitude is left open near the poles and
+    # across the antimeridian
+    dlat = radius_km / KM_PER_DEGREE
+    box = [PendingPickup.latitude.between(latitude - dlat, latitude + dlat)]
+    cos_lat = math.cos(math.radians(latitude))
+    if cos_lat > 0.01:
+        dlon = radius_km / (KM_PER_DEGREE * cos_lat)
+        if -180 <= longitude - dlon and longitude + dlon <= 180:
+            box.append(
+                PendingPickup.longitude.between(longitude - dlon, longitude + dlon)
+            )
+
+    found = {}
+    for precision in range(NEARBY_START_PRECISION, 0, -1):
+        cells, covered_km = geohash_block(latitude, longitude, precision)
+        rows = db.session.execute(
+            select(
+                PendingPickup.request_id,
+                PendingPickup.latitude,
+                PendingPickup.longitude,
+            ).where(or_(*[geohash_prefix(cell) for cell in cells]), *box)
+        )
+        for request_id, lat, lon in rows:
+            if request_id not in found:
+                distance = distance_km(latitude, longitude, lat, lon)
+                if distance <= radius_km:
+                    found[request_id] = distance
+
+        # Everything within covered_km of the point has now been read
+        if covered_km >= radius_km:
+            break
+        if len(found) >= limit:
+            kth = heapq.nsmallest(limit, found.values())[-1]
+            if kth <= covered_km:
+                break
+
+    ranked = heapq.nsmallest(limit, ((d, i) for i, d in found.items()))
+    rows = {
+        r.id: r
+        for r in db.session.execute(
+            select(*REQUEST_COLUMNS).where(
+                ScrapRequest.id.in_([i for _, i in ranked]),
+                ScrapRequest.status == "pending",
+            )
+        )
+    }
+    return [(distance, rows[i]) for distance, i in ranked if i in rows]
+
+
+@app.cli.command("rebuild-pickup-index")
+def rebuild_pickup_index():
+    """Recompute pending_pickups from pending requests and profile coordinates"""
+    rows = (
+        db.session.query(ScrapRequest, UserProfile)
+        .join(UserProfile, UserProfile.user_id == ScrapRequest.user_id)
+        .filter(
+            ScrapRequest.status == "pending",
+            UserProfile.latitude.isnot(None),
+            UserProfile.longitude.isnot(None),
+        )
+        .all()
+    )
+    PendingPickup.query.delete()
+    for scrap_request, profile in rows:
+        index_pickup(scrap_request, profile)
+    db.session.commit()
+    print(f"Indexed {len(rows)} pending pickups")
+
+
+# ---- REQUEST EVENTS
+def record_event(scrap_request, event_type, old_status=None):
+    """Add an outbox event for the request to the caller's transaction"""
+    db.session.add(
+        RequestEvent(
+            request_id=scrap_request.id,
+            user_id=scrap_request.user_id,
+            category_id=scrap_request.category_id,
+            event_type=event_type,
+            old_status=old_status,
+            status=scrap_request.status,
+            estimated_price=scrap_request.estimated_price,
+            assigned_dealer_id=scrap_request.assigned_dealer_id,
+        )
+    )
+
+
+def serialize_event(e):
+    return {
+        "id": e.id,
+        "request_id": e.request_id,
+        "user_id": e.user_id,
+        "category_id": e.category_id,
+        "event_type": e.event_type,
+        "old_status": e.old_status,
+        "status": e.status,
+        "estimated_price": e.estimated_price,
+        "assigned_dealer_id": e.assigned_dealer_id,
+        "created_at": e.created_at.isoformat(),
+    }
+
+
+def committed_through(after, scan):
+    """Highest id w such that every event id in (after, w] is either visible
+    or settled, reading at most `scan` ids. Returns (w, scan_full)"""
+    settled_before = datetime.datetime.utcnow() - datetime.timedelta(
+        seconds=EVENT_GAP_TIMEOUT
+    )
+    rows = (
+        db.session.query(RequestEvent.id, RequestEvent.created_at)
+        .filter(RequestEvent.id > after)
+        .order_by(RequestEvent.id)
+        .limit(scan)
+        .all()
+    )
+
+    through = after
+    for row in rows:
+        # Ids are handed out in order, so missing ids below a recent event
+        # may still be in flight; below an old one they were rolled back
+        # or compacted
+        if row.id != through + 1 and row.created_at > settled_before:
+            return through, False
+        through = row.id
+
+    return through, len(rows) == scan
+
+
+def load_events(after, limit, user_id=None, pending_pool=False, through=None):
+    """Events with id > after, oldest first, optionally only one user's or
+    those entering or leaving pending. Stops before any id that may still
+    be uncommitted, so cursors never skip a late commit; callers that already
+    know every id up to `through` is settled pass it to skip that check.
+    Returns (events, page_full)"""
+    scan_full = False
+    if through is None:
+        through, scan_full = committed_through(after, limit)
+
+    query = RequestEvent.query.filter(
+        RequestEvent.id > after, RequestEvent.id <= through
+    )
+    if user_id is not None:
+        query = query.filter(RequestEvent.user_id == user_id)
+    if pending_pool:
+        query = query.filter(
+            or_(RequestEvent.status == "pending", RequestEvent.old_status == "pending")
+        )
+
+    rows = query.order_by(RequestEvent.id).limit(limit).all()
+    return rows, len(rows) == limit or scan_full
+
+
+def compact_events(now=None):
+    """Drop events past retention, then superseded events past the compaction
+    horizon, EVENT_MAINTENANCE_BATCH ids per transaction. Returns rows deleted"""
+    now = now or datetime.datetime.utcnow()
+    retention = now - datetime.timedelta(hours=EVENT_RETENTION_HOURS)
+    horizon = now - datetime.timedelta(hours=EVENT_COMPACT_AFTER_HOURS)
+    deleted = 0
+
+    while True:
+        ids = [
+            row.id
+            for row in db.session.query(RequestEvent.id)
+            .filter(RequestEvent.created_at < retention)
+            .order_by(RequestEvent.id)
+            .limit(EVENT_MAINTENANCE_BATCH)
+        ]
+        if not ids:
+            break
+        RequestEvent.query.filter(RequestEvent.id.in_(ids)).delete(
+            synchronize_session=False
+        )
+        db.session.commit()
+        deleted += len(ids)
+
+    last_id = 0
+    while True:
+        rows = (
+            db.session.query(RequestEvent.id, RequestEvent.request_id)
+            .filter(RequestEvent.created_at < horizon, RequestEvent.id > last_id)
+            .order_by(RequestEvent.id)
+            .limit(EVENT_MAINTENANCE_BATCH)
+            .all()
+        )
+        if not rows:
+            break
+
+        latest = dict(
+            db.session.query(RequestEvent.request_id, func.max(RequestEvent.id))
+            .filter(RequestEvent.request_id.in_({r.request_id for r in rows}))
+            .group_by(RequestEvent.request_id)
+            .all()
+        )
+        stale = [r.id for r in rows if r.id < latest[r.request_id]]
+        if stale:
+            RequestEvent.query.filter(RequestEvent.id.in_(stale)).delete(
+                synchronize_session=False
+            )
+        db.session.commit()
+        deleted += len(stale)
+        last_id = rows[-1].id
+
+    return deleted
+
+
+def start_event_compaction():
+    if EVENT_COMPACT_INTERVAL <= 0:
+        return
+
+    def loop():
+        while True:
+            # Jitter keeps workers that started together from overlapping
+            time.sleep(EVENT_COMPACT_INTERVAL * random.uniform(0.9, 1.1))
+            with app.app_context():
+                try:
+                    deleted = compact_events()
+                    if deleted:
+                        print(f"[compact_events] Deleted {deleted} events")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Event compaction error: {e}")
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=loop, daemon=True).start()
+
+
+class EventBroadcaster:
+    """Per-worker tail of the outbox shared by every SSE stream. One thread
+    polls request_events and appends to a bounded buffer; streams wait on a
+    condition and read from the buffer, so idle connections cost no queries.
+    Streams that fall behind the buffer catch up from the table"""
+
+    def __init__(self, poll_interval, buffer_size):
+        self.poll_interval = poll_interval
+        self._events = deque(maxlen=buffer_size)
+        # Every event with id > _floor is in the buffer
+        self._floor = 0
+        self._last_id = 0
+        self._started = False
+        self._cond = threading.Condition()
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    @property
+    def floor(self):
+        return self._floor
+
+    def start(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+
+        # Start below any id that may still be in flight; the first poll
+        # reads forward from there
+        settled_before = datetime.datetime.utcnow() - datetime.timedelta(
+            seconds=EVENT_GAP_TIMEOUT
+        )
+        with app.app_context():
+            try:
+                last = (
+                    db.session.query(func.max(RequestEvent.id))
+                    .filter(RequestEvent.created_at <= settled_before)
+                    .scalar()
+                    or 0
+                )
+            finally:
+                db.session.remove()
+        self._floor = self._last_id = last
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def _loop(self):
+        while True:
+            time.sleep(self.poll_interval)
+            with app.app_context():
+                try:
+                    self._poll()
+                except Exception as e:
+                    print(f"Event broadcaster error: {e}")
+                finally:
+                    db.session.remove()
+
+    def _poll(self):
+        while True:
+            rows, page_full = load_events(self._last_id, EVENT_PAGE_SIZE)
+            if not rows:
+                return
+
+            with self._cond:
+                for row in rows:
+                    if len(self._events) == self._events.maxlen:
+                        self._floor = self._events[0]["id"]
+                    self._events.append(serialize_event(row))
+                self._last_id = rows[-1].id
+                self._cond.notify_all()
+
+            if not page_full:
+                return
+
+    def wait(self, after, timeout):
+        """Buffered events with id > after, waiting up to timeout for one.
+        Returns None when after is older than the buffer"""
+        with self._cond:
+            if after < self._floor:
+                return None
+            if after >= self._last_id:
+                self._cond.wait(timeout)
+                if after < self._floor:
+                    return None
+            return [e for e in self._events if e["id"] > after]
+
+    def stats(self):
+        return {
+            "started": self._started,
+            "buffered": len(self._events),
+            "last_id": self._last_id,
+        }
+
+
+event_broadcaster = EventBroadcaster(
+    poll_interval=SSE_POLL_INTERVAL,
+    buffer_size=SSE_BUFFER_SIZE,
+)
+
+
+@app.cli.command("compact-events")
+def compact_events_command():
+    """Apply event retention and compaction once"""
+    print(f"Deleted {compact_events()} events")
+
+
+@app.cli.command("rebuild-user-stats")
+def rebuild_user_stats():
+    """Recompute every user_stats row from scrap_requests in one transaction"""
+    rows = aggregate_user_stats()
+    UserStats.query.delete()
+    if rows:
+        db.session.execute(UserStats.__table__.insert(), rows)
+    db.session.commit()
+    print(f"Rebuilt stats for {len(rows)} users")
 
 
 # ---- ROUTES
 @app.route("/health", methods=["GET"])
 def health():
-    return jsonify({"status": "healthy", "service": "user-service"}), 200
+    return (
+        jsonify(
+            {
+                "status": "healthy",
+                "service": "user-service",
+                "token_cache": token_verifier.token_cache.stats(),
+                "revocation_list": token_verifier.revocation_list.stats(),
+                "pricing_snapshot": pricing_snapshot.stats(),
+                "event_broadcaster": event_broadcaster.stats(),
+            }
+        ),
+        200,
+    )
+
+
+REQUEST_COLUMNS = (
+    ScrapRequest.id,
+    ScrapRequest.user_id,
+    ScrapRequest.category_id,
+    ScrapRequest.quantity,
+    ScrapRequest.estimated_price,
+    ScrapRequest.pickup_address,
+    ScrapRequest.pickup_date,
+    ScrapRequest.status,
+    ScrapRequest.notes,
+    ScrapRequest.assigned_dealer_id,
+    ScrapRequest.created_at,
+)
+
+
+def serialize_request(r):
+    return {
+        "id": r.id,
+        "user_id": r.user_id,
+        "category_id": r.category_id,
+        "quantity": r.quantity,
+        "estimated_price": r.estimated_price,
+        "pickup_address": r.pickup_address,
+        "pickup_date": r.pickup_date.isoformat() if r.pickup_date else None,
+        "status": r.status,
+        "notes": r.notes,
+        "assigned_dealer_id": r.assigned_dealer_id,
+        "created_at": r.created_at.isoformat(),
+    }
 
 
 # ========== NEW ENDPOINT FOR DEALERS ==========
@@ -128,11 +955,15 @@ def get_all_requests():
     """
     Get ALL requests - for dealers and admins to see available pickups
     This is different from /api/users/requests which only returns current user's requests
+
+    Newest first, in keyset pages of ?limit= rows: pass next_cursor back as
+    ?cursor=. With ?format=ndjson every matching row (up to ?limit=) is
+    streamed one JSON object per line instead
     """
     user = get_current_user()
     if not user:
         return jsonify({"error": "Unauthorized"}), 401
-    
+
     # Only dealers and admins can see all requests
     if user.get("role") not in ["dealer", "admin"]:
         return jsonify({"error": "Forbidden - Dealers and admins only"}), 403
@@ -140,39 +971,102 @@ def get_all_requests():
     # Get query parameters
     status = request.args.get("status")
     limit = request.args.get("limit", type=int)
-    
-    query = ScrapRequest.query
-    
+    stream = request.args.get("format") == "ndjson"
+
+    query = select(*REQUEST_COLUMNS)
     if status:
-        query = query.filter_by(status=status)
-    
-    # Get all requests ordered by creation date (newest first)
-    query = query.order_by(ScrapRequest.created_at.desc())
-    
-    if limit:
-        query = query.limit(limit)
-    
-    all_requests = query.all()
+        query = query.where(ScrapRequest.status == status)
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            created_at, request_id = cursor.rsplit("_", 1)
+            created_at = datetime.datetime.fromisoformat(created_at)
+            request_id = int(request_id)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        query = query.where(
+            or_(
+                ScrapRequest.created_at < created_at,
+                and_(
+                    ScrapRequest.created_at == created_at,
+                    ScrapRequest.id < request_id,
+                ),
+            )
+        )
+
+    query = query.order_by(ScrapRequest.created_at.desc(), ScrapRequest.id.desc())
+
+    if stream:
+        if limit:
+            query = query.limit(limit)
+
+        def generate():
+            rows = db.session.execute(
+                query.execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            for row in rows:
+                yield app.json.dumps(serialize_request(row)) + "\n"
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/x-ndjson"
+        )
+
+    limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
 
-    print(f"[get_all_requests] Found {len(all_requests)} requests (status={status})")
+    print(f"[get_all_requests] Found {len(rows)} requests (status={status})")
+
+    return jsonify(
+        {
+            "requests": [serialize_request(r) for r in rows],
+            "next_cursor": (
+                f"{rows[-1].created_at.isoformat()}_{rows[-1].id}"
+                if has_more
+                else None
+            ),
+        }
+    )
+
+
+@app.route("/api/users/requests/nearby", methods=["GET"])
+def get_nearby_requests():
+    """Pending requests within ?radius_km= (default 10) of ?lat=&lon=, nearest
+    first, at most ?limit= of them - for dealers and admins"""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    if user.get("role") not in ["dealer", "admin"]:
+        return jsonify({"error": "Forbidden - Dealers and admins only"}), 403
+
+    latitude = request.args.get("lat", type=float)
+    longitude = request.args.get("lon", type=float)
+    if latitude is None or longitude is None:
+        return jsonify({"error": "lat and lon are required"}), 400
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        return jsonify({"error": "lat or lon out of range"}), 400
+
+    radius_km = request.args.get("radius_km", DEFAULT_NEARBY_RADIUS_KM, type=float)
+    if radius_km <= 0 or radius_km > MAX_NEARBY_RADIUS_KM:
+        return (
+            jsonify({"error": f"radius_km must be in (0, {MAX_NEARBY_RADIUS_KM:g}]"}),
+            400,
+        )
+
+    limit = request.args.get("limit", DEFAULT_NEARBY_LIMIT, type=int)
+    limit = max(1, min(limit, MAX_NEARBY_LIMIT))
+
+    nearby = find_nearby_pickups(latitude, longitude, radius_km, limit)
 
     return jsonify(
         {
             "requests": [
-                {
-                    "id": r.id,
-                    "user_id": r.user_id,
-                    "category_id": r.category_id,
-                    "quantity": r.quantity,
-                    "estimated_price": r.estimated_price,
-                    "pickup_address": r.pickup_address,
-                    "pickup_date": r.pickup_date.isoformat() if r.pickup_date else None,
-                    "status": r.status,
-                    "notes": r.notes,
-                    "assigned_dealer_id": r.assigned_dealer_id,
-                    "created_at": r.created_at.isoformat(),
-                }
-                for r in all_requests
+                dict(serialize_request(r), distance_km=round(distance, 3))
+                for distance, r in nearby
             ]
         }
     )
@@ -230,6 +1124,16 @@ def update_profile():
 
     try:
         db.session.add(profile)
+
+        # Pending pickups follow the profile's coordinates
+        PendingPickup.query.filter_by(user_id=user["id"]).delete(
+            synchronize_session=False
+        )
+        for scrap_request in ScrapRequest.query.filter_by(
+            user_id=user["id"], status="pending"
+        ):
+            index_pickup(scrap_request, profile)
+
         db.session.commit()
         return jsonify({"message": "Profile updated successfully"})
     except Exception as e:
@@ -252,7 +1156,9 @@ def create_request():
     profile = UserProfile.query.filter_by(user_id=user["id"]).first()
     location = profile.city if profile else "default"
 
-    estimated_price = calculate_price(data["category_id"], data["quantity"], location)
+    estimated_price = pricing_snapshot.quote(
+        data["category_id"], data["quantity"], location
+    )
 
     scrap_request = ScrapRequest(
         user_id=user["id"],
@@ -270,8 +1176,9 @@ def create_request():
     )
 
     try:
+        # Request, history, counters and outbox event commit together
         db.session.add(scrap_request)
-        db.session.commit()
+        db.session.flush()
 
         history = RequestHistory(
             request_id=scrap_request.id,
@@ -280,6 +1187,9 @@ def create_request():
             notes="Request created",
         )
         db.session.add(history)
+        record_status_change(user["id"], None, "pending", estimated_price)
+        record_event(scrap_request, "created")
+        index_pickup(scrap_request, profile)
         db.session.commit()
 
         print(f"[create_request] Created request #{scrap_request.id} for user {user['id']}")
@@ -456,6 +1366,21 @@ def update_status(request_id):
             ),
         )
         db.session.add(history)
+        record_status_change(
+            scrap_request.user_id,
+            old_status,
+            new_status,
+            scrap_request.estimated_price,
+        )
+        record_event(scrap_request, "status_changed", old_status)
+
+        if new_status == "pending" and old_status != "pending":
+            index_pickup(
+                scrap_request,
+                UserProfile.query.filter_by(user_id=scrap_request.user_id).first(),
+            )
+        elif new_status != "pending":
+            unindex_pickup(request_id)
         db.session.commit()
 
         print(f"[update_status] Request #{request_id} status: {old_status} -> {new_status}")
@@ -473,17 +1398,16 @@ def dashboard():
     if not user:
         return jsonify({"error": "Unauthorized"}), 401
 
-    total = ScrapRequest.query.filter_by(user_id=user["id"]).count()
-    pending = ScrapRequest.query.filter_by(user_id=user["id"], status="pending").count()
-    completed = ScrapRequest.query.filter_by(
-        user_id=user["id"], status="completed"
-    ).count()
-
-    completed_requests = ScrapRequest.query.filter_by(
-        user_id=user["id"], status="completed"
-    ).all()
-
-    total_earnings = sum(r.estimated_price or 0 for r in completed_requests)
+    stats = UserStats.query.get(user["id"])
+    if not stats:
+        # Users untouched since user_stats was added get their row on first view
+        try:
+            backfill_user_stats(user["id"])
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"User stats backfill error: {e}")
+        stats = UserStats.query.get(user["id"]) or UserStats()
 
     recent = (
         ScrapRequest.query.filter_by(user_id=user["id"])
@@ -495,10 +1419,12 @@ def dashboard():
     return jsonify(
         {
             "stats": {
-                "total_requests": total,
-                "pending_requests": pending,
-                "completed_requests": completed,
-                "total_earnings": round(total_earnings, 2),
+                "total_requests": stats.total_requests or 0,
+                "pending_requests": stats.pending_requests or 0,
+                "accepted_requests": stats.accepted_requests or 0,
+                "completed_requests": stats.completed_requests or 0,
+                "cancelled_requests": stats.cancelled_requests or 0,
+                "total_earnings": round(stats.total_earnings or 0, 2),
             },
             "recent_requests": [
                 {
@@ -514,6 +1440,192 @@ def dashboard():
     )
 
 
+# ========== EVENT FEED ==========
+@app.route("/api/users/events", methods=["GET"])
+def get_events():
+    """Request events with id > after, oldest first, for other services and
+    workers to tail. Past EVENT_COMPACT_AFTER_HOURS only each request's latest
+    event is kept; consumers further behind than EVENT_RETENTION_HOURS should
+    resync from /api/users/requests/all"""
+    user = get_current_user()
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    if user.get("role") not in ["dealer", "admin"]:
+        return jsonify({"error": "Forbidden - Dealers and admins only"}), 403
+
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", EVENT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, EVENT_PAGE_SIZE))
+
+    rows, page_full = load_events(after, limit)
+
+    return jsonify(
+        {
+            "events": [serialize_event(e) for e in rows],
+            "last_id": rows[-1].id if rows else after,
+            "has_more": page_full,
+        }
+    )
+
+
+@app.route("/api/users/events/ticket", methods=["POST"])
+def create_stream_ticket():
+    """Short-lived, single-use ticket for opening the event stream with
+    EventSource, so the JWT never appears in a URL or access log"""
+    token = request.headers.get("Authorization", "")
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    user = token_verifier.verify(token) if token else None
+    if not user:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    ticket = secrets.token_urlsafe(32)
+    now = datetime.datetime.utcnow()
+
+    try:
+        StreamTicket.query.filter(StreamTicket.expires_at <= now).delete()
+        db.session.add(
+            StreamTicket(
+                ticket_digest=hashlib.sha256(ticket.encode()).hexdigest(),
+                user_id=user["id"],
+                role=user.get("role"),
+                token_digest=token_digest(token),
+                token_expires_at=token_expiry(token),
+                expires_at=now + datetime.timedelta(seconds=SSE_TICKET_TTL),
+            )
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"ticket": ticket, "expires_in": SSE_TICKET_TTL}), 201
+
+
+def redeem_stream_ticket(ticket):
+    """Consume a ticket, returning it if it was valid and unused. The delete
+    is the claim, so concurrent redemptions on any worker succeed only once"""
+    row = StreamTicket.query.filter_by(
+        ticket_digest=hashlib.sha256(ticket.encode()).hexdigest()
+    ).first()
+    if not row:
+        return None
+
+    claimed = StreamTicket.query.filter(
+        StreamTicket.id == row.id,
+        StreamTicket.expires_at > datetime.datetime.utcnow(),
+    ).delete()
+    db.session.commit()
+    return row if claimed else None
+
+
+@app.route("/api/users/events/stream", methods=["GET"])
+def stream_events():
+    """Server-Sent Events for the caller's own requests, or for requests
+    entering or leaving pending for dealers and admins. Each event's id is
+    its outbox id, so reconnecting with Last-Event-ID (or ?last_event_id=)
+    resumes without gaps; without one the stream starts with new events only.
+    EventSource cannot set headers, so browsers pass ?ticket= from POST
+    /api/users/events/ticket instead of the token; a ticket opens one stream,
+    so reconnects fetch a new one"""
+    token = request.headers.get("Authorization")
+    ticket = request.args.get("ticket")
+
+    if token:
+        if token.startswith("Bearer "):
+            token = token[7:]
+        user = token_verifier.verify(token)
+        if not user:
+            return jsonify({"error": "Unauthorized"}), 401
+        digest = token_digest(token)
+        expires_at = token_expiry(token)
+    elif ticket:
+        row = redeem_stream_ticket(ticket)
+        if not row or token_verifier.revocation_list.is_revoked(row.token_digest):
+            return jsonify({"error": "Unauthorized"}), 401
+        user = {"id": row.user_id, "role": row.role}
+        digest = row.token_digest
+        expires_at = row.token_expires_at
+    else:
+        return jsonify({"error": "Unauthorized"}), 401
+
+    pending_pool = user.get("role") in ["dealer", "admin"]
+    user_id = None if pending_pool else user["id"]
+
+    event_broadcaster.start()
+    last_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "last_event_id"
+    )
+    if last_id:
+        try:
+            last_id = int(last_id)
+        except ValueError:
+            return jsonify({"error": "Invalid Last-Event-ID"}), 400
+    else:
+        # New streams start after the newest committed event; the broadcaster
+        # can trail it by EVENT_GAP_TIMEOUT just after it starts
+        last_id, scan_full = event_broadcaster.last_id, True
+        while scan_full:
+            last_id, scan_full = committed_through(last_id, EVENT_PAGE_SIZE)
+
+    closes_at = time.time() + SSE_MAX_DURATION
+    if expires_at:
+        closes_at = min(closes_at, expires_at)
+
+    def visible(e):
+        if pending_pool:
+            return "pending" in (e["status"], e["old_status"])
+        return e["user_id"] == user_id
+
+    def message(e):
+        data = app.json.dumps(e)
+        return f"id: {e['id']}\nevent: {e['event_type']}\ndata: {data}\n\n"
+
+    def generate():
+        cursor = last_id
+        last_write = time.time()
+        yield f"retry: {int(SSE_POLL_INTERVAL * 1000) + 1000}\n\n"
+
+        revocations = token_verifier.revocation_list
+        while time.time() < closes_at and not revocations.is_revoked(digest):
+            events = event_broadcaster.wait(cursor, SSE_HEARTBEAT_INTERVAL)
+            if events is None:
+                # Behind the shared buffer: catch up from the table. The
+                # broadcaster has settled every id up to its floor
+                floor = event_broadcaster.floor
+                with app.app_context():
+                    try:
+                        rows, _ = load_events(
+                            cursor, EVENT_PAGE_SIZE, user_id, pending_pool, floor
+                        )
+                        events = [serialize_event(r) for r in rows]
+                    finally:
+                        db.session.remove()
+                if not events:
+                    # Nothing of ours is missing below the buffer
+                    cursor = max(cursor, floor)
+                    continue
+
+            for e in events:
+                cursor = e["id"]
+                if visible(e):
+                    last_write = time.time()
+                    yield message(e)
+
+            if time.time() - last_write >= SSE_HEARTBEAT_INTERVAL:
+                # Keeps the connection open and moves the client's resume point
+                last_write = time.time()
+                yield f": heartbeat\nid: {cursor}\n\n"
+
+    response = Response(generate(), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Tell nginx-style proxies not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
 # ========== DEBUG ENDPOINT ==========
 @app.route("/api/users/debug/requests", methods=["GET"])
 def debug_requests():
@@ -555,3 +1667,6 @@ def debug_requests():
 with app.app_context():
     db.create_all()
     print("✓ Database tables created successfully")
+
+pricing_snapshot.start()
+start_event_compaction()